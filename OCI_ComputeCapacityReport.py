@@ -18,10 +18,24 @@ version = '3.0.3'
 import oci
 import os.path
 import argparse
-from modules.utils import green, clear, print_info
+from modules.utils import green, yellow, clear, print_info, print_error
 from modules.exceptions import RestartFlowException 
-from modules.identity import init_authentication, get_region_subscription_list, validate_region_connectivity, get_home_region, set_user_compartment
-from modules.capacity import denseio_flex_shapes, process_region, set_denseio_shape_ocpus, set_user_shape_name, set_user_shape_ocpus, set_user_shape_memory, print_shape_list
+from modules.identity import set_connectivity_ttl, init_authentication, init_multi_authentication, list_config_profiles, get_region_subscription_list, validate_region_connectivity, set_user_compartment, resolve_compartment_list
+from modules.capacity import denseio_flex_shapes, set_denseio_shape_ocpus, set_user_shape_name, set_user_shape_ocpus, set_user_shape_memory, print_shape_list, print_report_header, cancel_pending_cells, set_capacity_cache, set_batch_window, set_report_budget, set_query_mode
+from modules.sweep import run_multi_tenancy_scan, run_first_match_scan, run_region_sweep, rank_regions, run_compartment_comparison, run_watch
+from modules.server import serve_capacity
+from modules.jobs import run_job_file
+from modules.results import export_results
+from modules.limits import set_limits_check
+from modules.shapes import set_shape_index_ttl, get_shape_index, select_shape_regions
+from modules.history import set_history_retention, record_history
+from modules.analytics import run_analytics
+from modules.clients import create_client
+from modules.credentials import manage_signer
+from modules.trace import start_trace
+from modules.cassette import start_cassette, record_session, replay_session
+from modules.deadline import set_timeouts, new_sweep_deadline
+from modules.notify import CapacityNotifier
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Clear shell screen
@@ -41,16 +55,16 @@ def parse_arguments():
                         help='Path to your OCI config file, default: ~/.oci/config')
     
     parser.add_argument('-profile', default='DEFAULT', dest='config_profile',
-                        help='Config file section to use, default: DEFAULT')
+                        help='Config file section to use, e.g. "DEFAULT", "PROD,DEV" or "all_profiles", default: DEFAULT')
 
     parser.add_argument('-su', action='store_true',default=False, dest='su',
                         help='Notify the script that you have tenancy-level admin rights to prevent prompting.')
 
     parser.add_argument('-comp', default='', dest='compartment',
-                        help='Filter on a compartment when you do not have Admin rights at the tenancy level')
+                        help='Compartment OCID, name or path (e.g. Prod/Network) when you do not have Admin rights at the tenancy level')
     
     parser.add_argument('-region', default='', dest='target_region',
-                        help='Region name to analyze, e.g. "eu-frankfurt-1" or "all_regions", default is home region')
+                        help='Region name(s) to analyze, e.g. "eu-frankfurt-1", "eu-paris-1,eu-frankfurt-1" or "all_regions", default is home region')
  
     parser.add_argument('-shape', default='', dest='shape',
                         help='shape name to search')
@@ -64,21 +78,181 @@ def parse_arguments():
     parser.add_argument('-drcc', action='store_true',default=False, dest='drcc',
                         help='Print "available_count" value for DRCC customers and whitelisted tenancies')
 
+    parser.add_argument('-workers', type=int, default=10, dest='max_workers',
+                        help='Maximum number of regions and capacity requests processed concurrently, default: 10')
+
+    parser.add_argument('-max-age', type=int, default=0, dest='max_age',
+                        help='Reuse cached capacity results up to this age in seconds instead of querying OCI, default: 0 (always query)')
+
+    parser.add_argument('-stale', type=int, default=0, dest='stale',
+                        help='Also serve results up to max-age + stale seconds old while refreshing them in the background, default: 0')
+
+    parser.add_argument('-batch-window', type=int, default=20, dest='batch_window',
+                        help='Milliseconds during which fault domain queries of the same availability domain are merged into one request, default: 20, 0 disables batching')
+
+    parser.add_argument('-first', type=int, default=0, dest='first',
+                        help='Stop as soon as this number of AVAILABLE fault domains is found, scanning regions in priority order')
+
+    parser.add_argument('-connectivity-ttl', type=int, default=3600, dest='connectivity_ttl',
+                        help='Seconds during which a successful region connectivity check is reused, default: 3600, 0 always checks')
+
+    parser.add_argument('-shapes-ttl', type=int, default=86400, dest='shapes_ttl',
+                        help='Seconds during which the shapes listed in a region are reused, default: 86400, 0 always lists')
+
+    parser.add_argument('-ad-level', action='store_true', default=False, dest='ad_level',
+                        help='Query each availability domain once instead of each fault domain')
+
+    parser.add_argument('-fd-detail', action='store_true', default=False, dest='fd_detail',
+                        help='With -ad-level, expand AVAILABLE availability domains to their fault domains')
+
+    parser.add_argument('-limits', action='store_true', default=False, dest='limits',
+                        help='Check service limits and quotas first, availability domains where the shape cannot be launched are reported as LIMITED')
+
+    parser.add_argument('-jobs', default='', dest='job_file',
+                        help='Run every query job of a JSON, TOML or YAML job file in one batched execution')
+
+    parser.add_argument('-compare', default='', dest='compare_compartments',
+                        help='Compare capacity across compartments: OCIDs, names or paths, e.g. "Prod,Dev" or "Projects/*" for a subtree')
+
+    parser.add_argument('-export', default='', dest='export_path',
+                        help='Export results to a columnar .npz (NumPy), .parquet or .arrow (pyarrow) file')
+
+    parser.add_argument('-timeout', type=float, default=0, dest='timeout',
+                        help='Sweep deadline in seconds, pending cells are reported as TIMED_OUT, default: none')
+
+    parser.add_argument('-region-timeout', type=float, default=0, dest='region_timeout',
+                        help='Deadline in seconds for each region, default: none')
+
+    parser.add_argument('-notify', default='', dest='notify',
+                        help='Publish capacity transitions to "stdout", a webhook URL and/or "file:/path/to/queue", comma-separated')
+
+    parser.add_argument('-notify-debounce', type=int, default=2, dest='notify_debounce',
+                        help='Consecutive runs a new status must be seen before it is notified, default: 2')
+
+    parser.add_argument('-watch', type=float, default=0, dest='watch',
+                        help='Repeat the sweep every N seconds until Ctrl-C, requires -shape')
+
+    parser.add_argument('-record', default='', dest='record_path',
+                        help='Record every OCI API response of the run into a compressed cassette file')
+
+    parser.add_argument('-replay', default='', dest='replay_path',
+                        help='Replay a recorded cassette file offline, without authentication or network')
+
+    parser.add_argument('-replay-latency', default='', dest='replay_latency',
+                        help='Latency injected in replay mode: "recorded" or a number of milliseconds, default: none')
+
+    parser.add_argument('-history', type=int, default=0, dest='history_days',
+                        help='Retain the results of every sweep in the local history for N days, default: disabled')
+
+    parser.add_argument('-analytics', action='store_true', default=False, dest='analytics',
+                        help='Print availability analytics and the best retry window from the local history, then exit')
+
+    parser.add_argument('-analytics-csv', default='', dest='analytics_csv',
+                        help='Write the analytics summary per shape, region, AD, FD, day of week and hour to a CSV file')
+
+    parser.add_argument('-trace', default='', dest='trace_path',
+                        help='Write a Chrome trace JSON file of the run, for chrome://tracing, Perfetto or speedscope')
+
+    parser.add_argument('-serve', default='', dest='serve',
+                        help='Run as a capacity query server on "host:port" or "unix:/path/to/socket"')
+
     return parser.parse_args()
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Load command line arguments
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 args=parse_arguments()
+script_path = os.path.abspath(__file__)
+script_name = (os.path.basename(script_path))[:-3]
+script_version = version
+set_capacity_cache(args.max_age, args.stale)
+# Batch membership depends on thread timing, cassettes record one request per cell so replays match
+set_batch_window(0 if args.record_path or args.replay_path else args.batch_window)
+set_connectivity_ttl(args.connectivity_ttl)
+set_shape_index_ttl(args.shapes_ttl)
+set_report_budget(args.max_workers)
+set_query_mode(args.ad_level, args.fd_detail)
+set_limits_check(args.limits)
+set_timeouts(args.timeout, args.region_timeout)
+set_history_retention(args.history_days)
+
+if args.trace_path:
+    start_trace(args.trace_path)
+
+if args.record_path:
+    start_cassette(args.record_path, 'record')
+elif args.replay_path:
+    start_cassette(args.replay_path, 'replay', args.replay_latency)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Analytics over the local history, no authentication needed
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.analytics:
+    run_analytics(
+        args.shape,
+        args.target_region if args.target_region.lower() != 'all_regions' else '',
+        args.analytics_csv,
+        args.history_days
+    )
+    raise SystemExit(0)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Multi-profile mode: scan several tenancies in parallel
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.config_profile.lower() == 'all_profiles':
+    config_profiles = list_config_profiles(args.config_file_path)
+else:
+    config_profiles = [profile.strip() for profile in args.config_profile.split(',') if profile.strip()]
+
+if len(config_profiles) > 1:
+    if args.record_path or args.replay_path:
+        print_error("Record and replay modes support a single profile:", "record and replay each profile separately")
+        raise SystemExit(1)
+
+    if not args.shape:
+        print_error("Multi-profile mode requires a shape name:", "use the -shape argument")
+        raise SystemExit(1)
+
+    sessions = init_multi_authentication(args.config_file_path, config_profiles)
+
+    clear()
+    print(green(f"\n{'*'*94:94}"))
+    print_info(green, 'Script', 'started', script_name)
+    print_info(green, 'Script', 'version', script_version)
+    for config, signer, tenancy, auth_name, details in sessions:
+        print_info(green, 'Login', details, tenancy.name)
+    print_info(green, 'Shape', 'analyzed', args.shape)
+
+    rows = run_multi_tenancy_scan(
+        sessions,
+        args.target_region,
+        args.shape,
+        args.ocpus,
+        args.memory,
+        args.drcc,
+        args.max_workers
+    )
+    record_history(rows)
+    if args.export_path:
+        export_results(rows, args.export_path)
+    raise SystemExit(0)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Init OCI authentication
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-config, signer, tenancy, auth_name, details = init_authentication(
-     args.user_auth, 
-     args.config_file_path, 
-     args.config_profile
-     )
+if args.replay_path:
+    config, signer, auth_name, details = replay_session()
+    tenancy = create_client(oci.identity.IdentityClient, config, signer).get_tenancy(config['tenancy']).data
+else:
+    config, signer, tenancy, auth_name, details = init_authentication(
+         args.user_auth, 
+         args.config_file_path, 
+         config_profiles[0] if config_profiles else 'DEFAULT'
+         )
+    record_session(config, auth_name, details)
+
+    # Token based signers are refreshed in the background for long runs
+    signer = manage_signer(signer, auth_name, details)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Clear shell screen in case of authentication errors
@@ -88,9 +262,6 @@ clear()
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Start print script info
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-script_path = os.path.abspath(__file__)
-script_name = (os.path.basename(script_path))[:-3]
-script_version = version
 print(green(f"\n{'*'*94:94}"))
 print_info(green, 'Script', 'started', script_name)
 print_info(green, 'Script', 'version', script_version)
@@ -101,12 +272,27 @@ print_info(green, 'Tenancy', tenancy.name, f'home region: {tenancy.home_region_k
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Init oci service client
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-identity_client=oci.identity.IdentityClient(
-     config=config, 
-     signer=signer)
+identity_client=create_client(
+     oci.identity.IdentityClient,
+     config, 
+     signer)
 
 tenancy_id=config['tenancy']
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Job file mode: run many query jobs in one execution
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.job_file:
+    print(green(f"{'*'*94:94}\n"))
+    run_job_file(
+        args.job_file,
+        identity_client,
+        config,
+        signer,
+        args.compartment or tenancy_id
+    )
+    raise SystemExit(0)
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Set target regions
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -120,10 +306,6 @@ regions_validated=validate_region_connectivity(
      config,
      signer
      )
-home_region=get_home_region(
-     identity_client, 
-     tenancy_id
-     )
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # End print script info
@@ -137,6 +319,36 @@ if args.memory:
 
 print(green(f"{'*'*94:94}\n"))
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Compare capacity across several compartments
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.compare_compartments:
+    if not args.shape:
+        print_error("Compartment comparison requires a shape name:", "use the -shape argument")
+        raise SystemExit(1)
+
+    shape_regions = select_shape_regions(get_shape_index(config, signer, regions_validated, args.max_workers), regions_validated, args.shape)
+    if not shape_regions:
+        raise SystemExit(1)
+
+    compartments = resolve_compartment_list(identity_client, tenancy_id, args.compare_compartments)
+    print_info(green, 'Compartments', 'compared', len(compartments))
+
+    rows = run_compartment_comparison(
+        shape_regions,
+        config,
+        signer,
+        compartments,
+        args.shape,
+        args.ocpus,
+        args.memory,
+        args.max_workers
+    )
+    record_history(rows)
+    if args.export_path:
+        export_results(rows, args.export_path)
+    raise SystemExit(0)
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Set report variables
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -145,6 +357,54 @@ user_shape_name = args.shape
 user_shape_ocpus = args.ocpus
 user_shape_memory = args.memory
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Capacity transition notifications
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+notifier = None
+if args.notify:
+    notifier = CapacityNotifier(args.notify, (tenancy_id, user_compartment), args.notify_debounce)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Watch mode: repeat the sweep and notify transitions
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.watch:
+    if not user_shape_name:
+        print_error("Watch mode requires a shape name:", "use the -shape argument")
+        raise SystemExit(1)
+
+    # Reports the regions without the shape, every run selects the offering regions again
+    if not select_shape_regions(get_shape_index(config, signer, regions_validated, args.max_workers), regions_validated, user_shape_name):
+        raise SystemExit(1)
+
+    run_watch(
+        regions_validated,
+        config,
+        signer,
+        user_compartment,
+        user_shape_name,
+        user_shape_ocpus,
+        user_shape_memory,
+        args.drcc,
+        args.watch,
+        notifier,
+        args.max_workers
+    )
+    raise SystemExit(0)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Server mode: answer capacity queries from other processes
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+if args.serve:
+    serve_capacity(
+        args.serve,
+        config,
+        signer,
+        regions_validated,
+        user_compartment,
+        args.max_workers
+    )
+    raise SystemExit(0)
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Start analysis
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -155,13 +415,24 @@ def main(regions_validated, config, signer, user_compartment, user_shape_name, u
     Function to initialize and start analysis based on the user shape configuration.
     """
 
+    # Shapes offered by each analyzed region, listed concurrently once per process
+    shape_index = get_shape_index(config, signer, regions_validated, args.max_workers)
+
     # If the user shape is not provided, prompt and set it.
-    if not user_shape_name:
+    shape_prompted = not user_shape_name
+    if shape_prompted:
         if not hasattr(main, "first_execution"):
             main.first_execution = True
-            # Print available shapes in the tenancy's home region
-            print_shape_list(home_region, config, signer, user_compartment)
-        user_shape_name = set_user_shape_name(home_region, config, signer, user_compartment)
+            # Print available shapes in the analyzed regions
+            print_shape_list(shape_index)
+        user_shape_name = set_user_shape_name(shape_index)
+
+    # Invalid shape names are rejected before any capacity query, regions without the shape are skipped
+    shape_regions = select_shape_regions(shape_index, regions_validated, user_shape_name)
+    if not shape_regions:
+        if shape_prompted:
+            raise RestartFlowException
+        raise SystemExit(1)
             
     # Check if the shape is a DenseIO Flex shape
     if user_shape_name in denseio_flex_shapes:
@@ -179,17 +450,36 @@ def main(regions_validated, config, signer, user_compartment, user_shape_name, u
         user_shape_memory = set_user_shape_memory(user_shape_name) if not args.memory else args.memory
 
     # Print header with or without available_count
-    header = f"\n{'REGION':<20} {'AVAILABILITY_DOMAIN':<30} {'FAULT_DOMAIN':<20} {'SHAPE':<25} {'OCPU':<10} {'MEMORY':<10}"
-    if args.drcc:
-        header += f" {'AVAILABLE_COUNT':<16}"
-    header += f" {'AVAILABILITY'}\n"
+    print_report_header(args.drcc)
+
+    # Deadline of this sweep, also cancelled by Ctrl-C
+    deadline = new_sweep_deadline()
+
+    # First-match mode: scan in priority order and stop early
+    if args.first:
+        regions_by_priority = shape_regions
+        if args.target_region.lower() == 'all_regions':
+            regions_by_priority = rank_regions(shape_regions, config['tenancy'], user_shape_name)
+
+        rows = run_first_match_scan(regions_by_priority, config, signer, user_compartment, user_shape_name, user_shape_ocpus, user_shape_memory, args.drcc, args.first, args.max_workers, deadline)
+    else:
+        rows = run_region_sweep(shape_regions, config, signer, user_compartment, user_shape_name, user_shape_ocpus, user_shape_memory, args.drcc, args.max_workers, deadline)
+
+    abandoned_cells = sum(1 for row in rows if row['availability_status'] in ('TIMED_OUT', 'CANCELLED'))
+    if abandoned_cells:
+        print_info(yellow, 'Sweep', deadline.status.lower(), f"{abandoned_cells} cells")
+        cancel_pending_cells()
+
+    if notifier:
+        notifier.process(rows)
+
+    record_history(rows)
 
-    # Print the header
-    print(header)
+    if args.export_path:
+        export_results(rows, args.export_path)
 
-    for region in regions_validated:
-            config['region']=region.region_name
-            process_region(region, config, signer, user_compartment, user_shape_name, user_shape_ocpus, user_shape_memory, args.drcc)
+    if deadline.cancelled:
+        raise SystemExit("\nQuitting the program as per user request, partial results above.\n")
 
 # Start a loop to keep the script running until the user decides to quit
 while True:
@@ -0,0 +1,228 @@
+# coding: utf-8
+
+import csv
+import time
+from modules.utils import green, yellow, red, print_info, print_error, path_expander
+from modules.history import load_history
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Availability analytics over the retained history
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+GROUP_COLUMNS = ('shape', 'region', 'availability_domain', 'fault_domain')
+TIME_COLUMNS = {'day_of_week': 7, 'hour': 24}
+DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HEATMAP_LEVELS = ('··', '░░', '▒▒', '▓▓', '██')
+
+def load_observations(np, max_age_days=None):
+
+    """
+    Loads every retained observation into flat NumPy arrays: one code array per grouping column
+    (codes index a dictionary shared by all sweeps), the UTC day of week and hour of the sweep,
+    and an availability flag. Returns (observations, dictionaries, sweep count).
+    """
+
+    dictionaries = {column: [] for column in GROUP_COLUMNS}
+    lookups = {column: {} for column in GROUP_COLUMNS}
+    parts = {column: [] for column in (*GROUP_COLUMNS, *TIME_COLUMNS, 'available')}
+    sweeps = 0
+
+    for observed_at, table in load_history(max_age_days):
+        sweeps += 1
+        count = len(table)
+
+        # Re-map the codes of the sweep to the shared dictionaries, one lookup per distinct value
+        for column in GROUP_COLUMNS:
+            lookup = lookups[column]
+            mapping = np.array([
+                lookup.setdefault(value, len(lookup)) for value in table.dictionaries[column]
+            ], dtype=np.uint32)
+            parts[column].append(mapping[np.frombuffer(table.columns[column], dtype=np.uint32)])
+
+        available_code = table.lookups['availability_status'].get('AVAILABLE', -1)
+        parts['available'].append(np.frombuffer(table.columns['availability_status'], dtype=np.uint32) == available_code)
+
+        moment = time.gmtime(observed_at)
+        parts['day_of_week'].append(np.full(count, moment.tm_wday, dtype=np.uint32))
+        parts['hour'].append(np.full(count, moment.tm_hour, dtype=np.uint32))
+
+    for column in GROUP_COLUMNS:
+        dictionaries[column] = sorted(lookups[column], key=lookups[column].get)
+
+    if not sweeps:
+        return None, dictionaries, 0
+
+    observations = {column: np.concatenate(arrays) for column, arrays in parts.items()}
+    return observations, dictionaries, sweeps
+
+def aggregate(np, observations, dictionaries, columns, mask):
+
+    """
+    Counts available and total observations per combination of columns, for the observations selected by mask.
+    Grouping columns are decoded, time columns stay integers. Returns {(values...): (available, total)}.
+    """
+
+    sizes = [len(dictionaries[column]) if column in dictionaries else TIME_COLUMNS[column] for column in columns]
+
+    # Combine the codes of every column into a single group index
+    group_index = np.zeros(int(mask.sum()), dtype=np.int64)
+    for column, size in zip(columns, sizes):
+        group_index = group_index * size + observations[column][mask]
+
+    groups, inverse = np.unique(group_index, return_inverse=True)
+    totals = np.bincount(inverse)
+    available = np.bincount(inverse, weights=observations['available'][mask])
+
+    result = {}
+    for group, group_available, group_total in zip(groups.tolist(), available.tolist(), totals.tolist()):
+        key = []
+        for column, size in zip(reversed(columns), reversed(sizes)):
+            group, code = divmod(group, size)
+            key.append(dictionaries[column][code] if column in dictionaries else code)
+        result[tuple(reversed(key))] = (int(group_available), group_total)
+
+    return result
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Forecast the best retry window
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def best_window(np, week_available, week_total, width=3):
+
+    """
+    Finds the window of width consecutive hours of the week (wrapping around Sunday night)
+    with the highest availability rate. Rates are smoothed with one success and one failure
+    so sparse windows do not win on a single lucky observation.
+    Returns (start slot, rate, observations) or None without observations.
+    """
+
+    if not week_total.sum():
+        return None
+
+    window_available = sum(np.roll(week_available, -offset) for offset in range(width))
+    window_total = sum(np.roll(week_total, -offset) for offset in range(width))
+
+    score = np.where(window_total > 0, (window_available + 1) / (window_total + 2), -1)
+    start = int(np.argmax(score))
+
+    return start, window_available[start] / window_total[start], int(window_total[start])
+
+def next_occurrence(slot):
+
+    """
+    Returns the next UTC time at which an hour-of-week slot (Monday 00:00 is slot 0) starts.
+    """
+
+    now = time.time()
+    moment = time.gmtime(now)
+    current_slot = moment.tm_wday * 24 + moment.tm_hour
+    hour_start = now - moment.tm_min * 60 - moment.tm_sec
+
+    return hour_start + ((slot - current_slot) % 168) * 3600
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Print analytics
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def print_heatmap(grid):
+
+    """
+    Prints the availability rate of each day of week and hour (UTC) of a shape.
+    """
+
+    print("\n      " + ''.join(f"{hour:02d} " for hour in range(24)) + " UTC")
+    for day, day_name in enumerate(DAY_NAMES):
+        cells = []
+        for hour in range(24):
+            available, total = grid.get((day, hour), (0, 0))
+            if not total:
+                cells.append('   ')
+                continue
+            rate = available / total
+            cells.append(HEATMAP_LEVELS[0 if not available else 1 + min(3, int(rate * 4))] + ' ')
+        print(f"{day_name:<6}" + ''.join(cells))
+
+    print(f"\n      {HEATMAP_LEVELS[0]} never available  {HEATMAP_LEVELS[1]} <25%  {HEATMAP_LEVELS[2]} <50%  {HEATMAP_LEVELS[3]} <75%  {HEATMAP_LEVELS[4]} 75% or more  (blank: no observations)")
+
+def write_summary_csv(path, summary):
+
+    """
+    Writes the availability of every shape, region, availability domain, fault domain, day of week and hour.
+    """
+
+    with open(path_expander(path), 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['shape', 'region', 'availability_domain', 'fault_domain', 'day_of_week', 'hour_utc', 'available', 'observations', 'availability_rate'])
+        for (shape, region, availability_domain, fault_domain, day, hour), (available, total) in sorted(summary.items(), key=lambda item: tuple(str(value) for value in item[0])):
+            writer.writerow([shape, region, availability_domain, fault_domain or '', DAY_NAMES[day], hour, available, total, round(available / total, 4)])
+
+def run_analytics(shape_name=None, region_name=None, csv_path=None, max_age_days=None, window=3):
+
+    """
+    Aggregates the retained history by shape and region, prints a day of week / hour heatmap
+    and the best retry window of every shape, and optionally writes the full summary to CSV.
+    Filters on a shape and a region when given. Requires NumPy.
+    """
+
+    try:
+        import numpy as np
+    except ImportError:
+        print_error("Analytics require NumPy:", "python3 -m pip install numpy")
+        raise SystemExit(1)
+
+    start_time = time.time()
+    observations, dictionaries, sweeps = load_observations(np, max_age_days)
+
+    if observations is None:
+        print_error("No capacity history found:", "run sweeps with -history DAYS to retain their results", level='INFO')
+        return
+
+    mask = np.ones(len(observations['available']), dtype=bool)
+    for column, value in (('shape', shape_name), ('region', region_name)):
+        if value:
+            lookup = {name: code for code, name in enumerate(dictionaries[column])}
+            if value not in lookup:
+                print_error(f"No history for this {column}:", value, level='INFO')
+                return
+            mask &= observations[column] == lookup[value]
+
+    print_info(green, 'History', 'observations', f"{int(mask.sum())} from {sweeps} sweeps")
+
+    # Availability per shape and region
+    print(f"\n{'SHAPE':<26} {'REGION':<20} {'AVAILABLE':>10} {'OBSERVATIONS':>13} {'RATE':>7}\n")
+    for (shape, region), (available, total) in sorted(aggregate(np, observations, dictionaries, ('shape', 'region'), mask).items()):
+        line = f"{shape:<26} {region:<20} {available:>10} {total:>13} {available / total:>7.0%}"
+        print(green(line) if available else line)
+
+    # Heatmap and best retry window per shape
+    shape_codes = np.unique(observations['shape'][mask])
+    for shape_code in shape_codes.tolist():
+        shape = dictionaries['shape'][shape_code]
+        shape_mask = mask & (observations['shape'] == shape_code)
+        grid = aggregate(np, observations, dictionaries, ('day_of_week', 'hour'), shape_mask)
+
+        print(green(f"\n{shape}"))
+        print_heatmap(grid)
+
+        week_available = np.zeros(168)
+        week_total = np.zeros(168)
+        for (day, hour), (available, total) in grid.items():
+            week_available[day * 24 + hour] = available
+            week_total[day * 24 + hour] = total
+
+        forecast = best_window(np, week_available, week_total, window)
+        if forecast is None:
+            continue
+
+        slot, rate, total = forecast
+        end_slot = (slot + window) % 168
+        window_text = f"{DAY_NAMES[slot // 24]} {slot % 24:02d}:00-{DAY_NAMES[end_slot // 24]} {end_slot % 24:02d}:00 UTC"
+        next_start = time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(next_occurrence(slot)))
+
+        print()
+        print_info(green if rate else red, 'Best window', window_text, f"{rate:.0%} of {total} observations")
+        print_info(green if rate else red, 'Best window', 'next retry', next_start)
+
+    if csv_path:
+        summary = aggregate(np, observations, dictionaries, (*GROUP_COLUMNS, 'day_of_week', 'hour'), mask)
+        write_summary_csv(csv_path, summary)
+        print_info(green, 'Analytics', 'written', f"{len(summary)} rows to {csv_path}")
+
+    print_info(yellow, 'Analytics', 'duration', f"{time.time() - start_time:.2f}s")
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from modules.utils import path_expander
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Local cache location
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+cache_dir_settings = {'base_dir': None}
+
+def set_cache_dir(base_dir):
+
+    """
+    Overrides the local cache directory for this process, None restores the default.
+    """
+
+    cache_dir_settings['base_dir'] = base_dir
+
+def get_cache_dir(namespace=''):
+
+    """
+    Returns the local cache directory, created on first use.
+    Defaults to $XDG_CACHE_HOME/OCI_ComputeCapacityReport, overridden by $OCI_CCR_CACHE_DIR
+    or by set_cache_dir.
+    """
+
+    base_dir = cache_dir_settings['base_dir'] or os.environ.get('OCI_CCR_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME', '~/.cache'),
+        'OCI_ComputeCapacityReport'
+    )
+    cache_dir = os.path.join(path_expander(base_dir), namespace)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return cache_dir
+
+def cache_key(*parts):
+
+    """
+    Builds a stable file-safe key from any number of values.
+    """
+
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Read and write cache entries
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def read_cache(namespace, key, max_age=None):
+
+    """
+    Returns (value, age_in_seconds) for a cache entry, or (None, None) if the entry
+    does not exist, cannot be read or is older than max_age seconds.
+    """
+
+    try:
+        with open(os.path.join(get_cache_dir(namespace), f"{key}.json"), 'r') as cache_file:
+            entry = json.load(cache_file)
+
+        age = time.time() - entry['created']
+        if max_age is not None and age > max_age:
+            return None, None
+
+        return entry['value'], age
+
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def write_cache(namespace, key, value):
+
+    """
+    Stores a JSON serializable value in the cache.
+    The entry is written to a temporary file then renamed, so concurrent readers
+    and writers never see a partial entry.
+    """
+
+    try:
+        cache_dir = get_cache_dir(namespace)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump({'created': time.time(), 'value': value}, cache_file)
+        os.replace(tmp_path, os.path.join(cache_dir, f"{key}.json"))
+
+    except OSError:
+        # A cache failure must never break a run
+        pass
@@ -2,9 +2,202 @@
 
 import re
 import oci
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from modules.utils import yellow,red, print_error
-from modules.identity import get_availability_domains, get_fault_domains, get_compartment_name
+from modules.cache import cache_key, read_cache, write_cache
+from modules.coalesce import SingleFlight, CapacityBatcher
+from modules.identity import get_compartment_name
+from modules.clients import get_identity_client, get_compute_client
+from modules.topology import get_cached_availability_domains, get_cached_fault_domains, get_cached_shapes
 from modules.exceptions import RestartFlowException 
+from modules.deadline import new_region_deadline, deadline_scope, deadline_call_kwargs
+from modules.limits import limited_availability_domains
+from modules.trace import traced, trace_span
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Shared concurrency budget
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+report_budget = threading.BoundedSemaphore(10)
+
+def set_report_budget(max_workers):
+
+    """
+    Sets the maximum number of capacity report calls allowed in flight at the same time,
+    shared by every region and tenancy scanned concurrently.
+    """
+
+    global report_budget
+    report_budget = threading.BoundedSemaphore(max(1, int(max_workers)))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Shared capacity results cache
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+capacity_cache_settings = {'max_age': 0, 'stale': 0}
+revalidation_slots = threading.BoundedSemaphore(4)
+revalidation_in_flight = set()
+revalidation_lock = threading.Lock()
+
+def set_capacity_cache(max_age, stale=0):
+
+    """
+    Sets how old (in seconds) a cached capacity result may be to be reused instead of querying OCI.
+    Results older than max_age but within the stale window are still returned, 
+    and refreshed in the background for the next callers.
+    """
+
+    capacity_cache_settings['max_age'] = max(0, max_age or 0)
+    capacity_cache_settings['stale'] = max(0, stale or 0)
+
+def send_capacity_report(core_client, report_details):
+
+    """
+    Calls the capacity report API and returns the raw shape availabilities.
+    """
+
+    # Released to the budget it was acquired from, even if the budget is resized meanwhile
+    budget = report_budget
+
+    # Time spent waiting for the shared budget is traced apart from the API call
+    with trace_span('wait report budget'):
+        budget.acquire()
+    try:
+        with trace_span('create_compute_capacity_report', cells=len(report_details.shape_availabilities)):
+            report = core_client.create_compute_capacity_report(create_compute_capacity_report_details=report_details, **deadline_call_kwargs())
+    finally:
+        budget.release()
+
+    return report.data.shape_availabilities
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Deduplicate and batch capacity report calls
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+capacity_single_flight = SingleFlight()
+capacity_batcher = CapacityBatcher(send_capacity_report)
+cell_executor = ThreadPoolExecutor(max_workers=32)
+
+def cancel_pending_cells():
+
+    """
+    Cancels the cells still queued, e.g. abandoned after a deadline expired, so they neither run
+    nor hold the exit of the script. Running cells end within their deadline, later sweeps get a new pool.
+    """
+
+    global cell_executor
+    previous_executor, cell_executor = cell_executor, ThreadPoolExecutor(max_workers=32)
+    previous_executor.shutdown(wait=False, cancel_futures=True)
+
+def set_batch_window(window_ms):
+
+    """
+    Sets how long (in milliseconds) cells of the same availability domain are collected
+    before being sent as a single capacity report request. 0 disables batching.
+    """
+
+    capacity_batcher.window = max(0, window_ms or 0) / 1000
+
+def fetch_capacity_results(core_client, report_details):
+
+    """
+    Calls the capacity report API, through the batching layer, and returns the results as plain dictionaries.
+    """
+
+    return [
+        {'available_count': result.available_count, 'availability_status': result.availability_status}
+        for result in capacity_batcher.fetch(core_client, report_details)
+    ]
+
+def fetch_and_cache_capacity_results(core_client, report_details, key):
+
+    """
+    Fetches capacity results and stores them in the cache.
+    Identical cells requested concurrently share a single call.
+    """
+
+    def fetch_and_store():
+        results = fetch_capacity_results(core_client, report_details)
+        write_cache('capacity', key, results)
+        return results
+
+    return capacity_single_flight.do(key, fetch_and_store)
+
+def revalidate_capacity_results(core_client, report_details, key):
+
+    """
+    Refreshes a stale cache entry, errors are ignored as the stale value was already served.
+    At most 4 entries are refreshed at a time.
+    """
+
+    try:
+        with revalidation_slots:
+            fetch_and_cache_capacity_results(core_client, report_details, key)
+    except Exception:
+        pass
+    finally:
+        with revalidation_lock:
+            revalidation_in_flight.discard(key)
+
+def get_capacity_results(core_client, report_details, key):
+
+    """
+    Returns (results, cache_age) for a capacity report, served from the local cache when fresh enough.
+    cache_age is None when the results come straight from OCI.
+    """
+
+    max_age = capacity_cache_settings['max_age']
+
+    if max_age:
+        results, age = read_cache('capacity', key, max_age + capacity_cache_settings['stale'])
+
+        if results is not None:
+            # Serve the stale value and refresh it once in the background, in a daemon thread
+            # so a refresh still in flight never delays the exit
+            if age > max_age:
+                with revalidation_lock:
+                    if key not in revalidation_in_flight:
+                        revalidation_in_flight.add(key)
+                        threading.Thread(
+                            target=revalidate_capacity_results,
+                            args=(core_client, report_details, key),
+                            name='revalidate',
+                            daemon=True
+                        ).start()
+            return results, age
+
+    return fetch_and_cache_capacity_results(core_client, report_details, key), None
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Availability domain or fault domain level queries
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+query_mode_settings = {'ad_level': False, 'fd_detail': False}
+
+def set_query_mode(ad_level, fd_detail=False):
+
+    """
+    ad_level: query each availability domain once, without fault domain, letting OCI aggregate.
+    fd_detail: in ad_level mode, expand AVAILABLE availability domains to per fault domain queries.
+    """
+
+    query_mode_settings['ad_level'] = bool(ad_level)
+    query_mode_settings['fd_detail'] = bool(fd_detail)
+
+def needs_fault_domain_detail(ad_rows):
+
+    """
+    Tells if availability domain level results must be expanded to fault domains.
+    OUT_OF_HOST_CAPACITY and HARDWARE_NOT_SUPPORTED apply to every fault domain, AVAILABLE only
+    means at least one fault domain has capacity: it is expanded when -fd-detail is requested.
+    Unexpected statuses are always expanded.
+    """
+
+    for row in ad_rows:
+        status = row['availability_status']
+        if status == 'AVAILABLE' and query_mode_settings['fd_detail']:
+            return True
+        if status not in ('AVAILABLE', 'OUT_OF_HOST_CAPACITY', 'HARDWARE_NOT_SUPPORTED'):
+            return True
+
+    return False
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Request user to set an oCPU value
@@ -37,12 +230,12 @@ def set_user_shape_memory(user_shape_name):
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Print the list of available compute shapes
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def print_shape_list(home_region, config, signer, compartment_id):
+def print_shape_list(shape_index):
 
     """
     Update and return the list of compute shapes.
     The following list was updated on September 9th.
-    This list is automatically refreshed when a new shape is detected in the connected region.
+    This list is automatically refreshed with the shapes of every analyzed region, from the shape index.
     """
 
     all_shapes = [
@@ -59,18 +252,8 @@ def print_shape_list(home_region, config, signer, compartment_id):
 
     try:
 
-        config['region']=home_region.region_name
-        core_client = oci.core.ComputeClient(config=config, signer=signer)
-    
-        # Fetch and sort available shapes in the region
-        shapes_in_home_region = core_client.list_shapes(compartment_id).data
-
-        # Update all_shapes list if new shapes found
-        for shape in shapes_in_home_region:
-            if shape.shape not in all_shapes:
-                all_shapes.append(shape.shape)
-        
-        all_shapes = sorted(all_shapes)
+        # Shapes offered in any analyzed region, including those not offered in the home region
+        all_shapes = sorted(set(all_shapes).union(shape_index.shape_names()))
 
         print(yellow("\nGet all available shapes at: https://docs.oracle.com/en-us/iaas/Content/Compute/References/computeshapes.htm\n"))
 
@@ -92,7 +275,7 @@ def print_shape_list(home_region, config, signer, compartment_id):
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Define target shape name to analyze 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def set_user_shape_name(home_region, config, signer, compartment_id):
+def set_user_shape_name(shape_index):
 
     if not hasattr(set_user_shape_name, "first_execution"):
         set_user_shape_name.first_execution = True
@@ -111,7 +294,7 @@ def set_user_shape_name(home_region, config, signer, compartment_id):
             raise RestartFlowException
 
         elif user_input in {'P', 'PRINT', 'p', 'print'}:
-            print_shape_list(home_region, config, signer, compartment_id)
+            print_shape_list(shape_index)
             user_input = input(yellow("\nEnter a shape name or [Q]uit: ")).strip()
 
             if user_input in {'Q', 'QUIT', 'q', 'quit'}:
@@ -151,17 +334,53 @@ def set_denseio_shape_ocpus(shape_name):
         else:
             print(red(f"Invalid input. Please select one of the following values: {allowed_ocpus}"))
 
+def shape_request_error(user_shape_name, user_shape_ocpus):
+
+    """
+    Returns why the oCPU value cannot be requested for the shape, or None when it can.
+    """
+
+    allowed_ocpus = denseio_flex_shapes.get(user_shape_name)
+    if allowed_ocpus and str(user_shape_ocpus) not in allowed_ocpus:
+        return f"Shape {user_shape_name} requires -ocpus set to one of {allowed_ocpus}"
+
+    return None
+
+def resolve_shape_request(user_shape_name, user_shape_ocpus, user_shape_memory):
+
+    """
+    Non-interactive counterpart of the shape prompts: returns the oCPU and memory values
+    to request for the given shape, using defaults instead of asking the user.
+    """
+
+    # DenseIO Flex shapes only accept predefined oCPU values
+    if user_shape_name in denseio_flex_shapes:
+        error = shape_request_error(user_shape_name, user_shape_ocpus)
+        if error:
+            print_error(error)
+            raise SystemExit(1)
+        return float(user_shape_ocpus), user_shape_memory
+
+    # For shapes that are not Flex or Bare Metal unset ocpus and memory
+    if ".Flex" not in user_shape_name or user_shape_name.startswith('BM.'):
+        return 0, 0
+
+    # Flex shapes default to 1 oCPU, memory is adjusted later by get_shape_config
+    return user_shape_ocpus or 1, user_shape_memory or 1
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Fetch available shapes and availability domains
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def fetch_shapes_and_domains(core_client, identity_client, compartment_id):
+@traced
+def fetch_shapes_and_domains(core_client, identity_client, compartment_id, region_name):
 
     """
     Fetches the availability domains and compute shapes for a given compartment_id.
+    Both are fetched once per region and process, then served from memory.
     """
     try:
-        availability_domains = get_availability_domains(identity_client, compartment_id)
-        shapes_in_region = core_client.list_shapes(compartment_id).data
+        availability_domains = get_cached_availability_domains(identity_client, compartment_id, region_name)
+        shapes_in_region = get_cached_shapes(core_client, compartment_id, region_name)
         return availability_domains, shapes_in_region
     except Exception as e:
         print_error(e)
@@ -170,6 +389,7 @@ def fetch_shapes_and_domains(core_client, identity_client, compartment_id):
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Determine OCPU/memory configuration for a shape
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
+@traced
 def get_shape_config(user_shape_name, shapes_in_region, user_shape_ocpus, user_shape_memory):
 
     """
@@ -249,55 +469,166 @@ def get_shape_config(user_shape_name, shapes_in_region, user_shape_ocpus, user_s
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Process region by fetching data and creating report
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def process_region(region, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, drcc):
+@traced
+def process_region(region, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, renderer, tenancy_name=None, stop_event=None, on_rows=None, deadline=None):
 
     """
     Processes the specified region by fetching and configuring compute shape data, 
-    then generates and prints reports for each availability domain and fault domain.
+    then generates and hands the rows of each availability domain and fault domain to the renderer.
+    Returns the list of result rows.
+    on_rows is called with the rows of each availability domain, and the remaining
+    availability domains are skipped as soon as stop_event is set.
+    Cells still pending when the region deadline (bounded by the sweep deadline) expires,
+    or is cancelled, are returned as TIMED_OUT or CANCELLED rows.
     """
 
-    config['region'] = region.region_name
-    identity_client = oci.identity.IdentityClient(config=config, signer=signer)
-    core_client = oci.core.ComputeClient(config=config, signer=signer)
+    region_deadline = new_region_deadline(deadline)
 
-    # Fetch shapes and availabitity domains
-    availability_domains, shapes_in_region = fetch_shapes_and_domains(core_client, identity_client, config['tenancy'])
+    # Requests sent while processing the region, cells included, are bounded by its deadline
+    with deadline_scope(region_deadline):
+        # Work on a copy so regions can be processed concurrently
+        config = dict(config, region=region.region_name)
+        identity_client = get_identity_client(config, signer)
+        core_client = get_compute_client(config, signer)
 
-    try:
-        # Retrieve shape configuration
-        shape_ocpus, shape_memory, shape_is_flex, shape_info = get_shape_config(user_shape_name, shapes_in_region, user_shape_ocpus, user_shape_memory)
-    except Exception as e:
-        print_error(e.message)
+        # Fetch shapes and availabitity domains
+        availability_domains, shapes_in_region = fetch_shapes_and_domains(core_client, identity_client, config['tenancy'], region.region_name)
 
-    # Process each availability domain and fault domain
-    for availability_domain in availability_domains:
-        fault_domains = get_fault_domains(identity_client, config['tenancy'], availability_domain)
-
-        for fault_domain in fault_domains:
-            create_and_print_report(
-                region.region_name,
-                identity_client,
-                core_client,
-                availability_domain,
-                fault_domain,
-                compartment_id,
-                shape_info,
-                user_shape_name,
-                drcc,
-                shape_ocpus,
-                shape_memory,
-                shape_is_flex
-            )
+        try:
+            # Retrieve shape configuration
+            shape_ocpus, shape_memory, shape_is_flex, shape_info = get_shape_config(user_shape_name, shapes_in_region, user_shape_ocpus, user_shape_memory)
+        except Exception as e:
+            print_error(e.message)
+
+        # Availability domains where limits or quotas leave nothing to launch are not queried
+        limited_domains = limited_availability_domains(config, signer, compartment_id, region.region_name, user_shape_name, availability_domains)
+
+        def query_and_print_cells(availability_domain, fault_domains, show=True):
+
+            # Query all cells concurrently so they are batched into a single request
+            futures = [
+                cell_executor.submit(
+                    region_deadline.call,
+                    query_capacity_cell,
+                    region.region_name,
+                    core_client,
+                    availability_domain,
+                    fault_domain,
+                    compartment_id,
+                    shape_info,
+                    user_shape_name,
+                    shape_ocpus,
+                    shape_memory,
+                    shape_is_flex,
+                    tenancy_name,
+                    config['tenancy']
+                )
+                for fault_domain in fault_domains
+            ]
+
+            renderer.cells_started(len(futures))
+
+            # Print results in fault domain order
+            cells_rows = []
+            for future, fault_domain in zip(futures, fault_domains):
+                try:
+                    cell_rows = region_deadline.result(future)
+                except FuturesTimeoutError:
+                    future.cancel()
+                    cell_rows = [abandoned_cell_row(region.region_name, availability_domain, fault_domain, user_shape_name, shape_ocpus, shape_memory, tenancy_name, region_deadline.status)]
+                except oci.exceptions.ServiceError as e:
+                    renderer.cell_failed((tenancy_name, region.region_name))
+                    handle_report_error(e, identity_client, compartment_id)
+
+                renderer.cell_done((tenancy_name, region.region_name), cell_rows if show else [])
+                cells_rows += cell_rows
+
+            return cells_rows
+
+        rows = []
+
+        # Process each availability domain and fault domain
+        for availability_domain in availability_domains:
+            if stop_event and stop_event.is_set():
+                break
+
+            if region_deadline.expired() or availability_domain in limited_domains:
+                # Availability domains not started, or without limit left for the shape, are reported as a whole
+                status = region_deadline.status if region_deadline.expired() else 'LIMITED'
+                ad_rows = [abandoned_cell_row(region.region_name, availability_domain, None, user_shape_name, shape_ocpus, shape_memory, tenancy_name, status)]
+                renderer.cells_started(1)
+                renderer.cell_done((tenancy_name, region.region_name), ad_rows)
+                rows += ad_rows
+                continue
+
+            if query_mode_settings['ad_level']:
+                # One query for the whole availability domain, fault domains are only resolved when needed.
+                # Fault domain rows replace the availability domain row, so capacity is never counted twice
+                ad_rows = query_and_print_cells(availability_domain, [None], show=False)
+                if needs_fault_domain_detail(ad_rows) and not region_deadline.expired():
+                    fault_domains = get_cached_fault_domains(identity_client, config['tenancy'], region.region_name, availability_domain)
+                    ad_rows = query_and_print_cells(availability_domain, fault_domains)
+                else:
+                    renderer.add_rows((tenancy_name, region.region_name), ad_rows)
+            else:
+                fault_domains = get_cached_fault_domains(identity_client, config['tenancy'], region.region_name, availability_domain)
+                ad_rows = query_and_print_cells(availability_domain, fault_domains)
+
+            rows += ad_rows
+            if on_rows:
+                on_rows(ad_rows)
+
+        return rows
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-# Create OCI compute shape report
+# Print report header and rows
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def create_and_print_report(region, identity_client, core_client, availability_domain, fault_domain, compartment_id, shape_info, shape_name, drcc, shape_ocpus=None, shape_memory=None, shape_is_flex=False):
+def format_report_header(drcc, tenancy=False):
 
     """
-    Creates a compute capacity report for a specific region and shape, and prints the results.
+    Formats the report header, with or without the available_count and tenancy columns.
     """
-    
+
+    header = f"\n{'TENANCY':<25} " if tenancy else "\n"
+    header += f"{'REGION':<20} {'AVAILABILITY_DOMAIN':<30} {'FAULT_DOMAIN':<20} {'SHAPE':<25} {'OCPU':<10} {'MEMORY':<10}"
+    if drcc:
+        header += f" {'AVAILABLE_COUNT':<16}"
+    header += f" {'AVAILABILITY'}\n"
+
+    return header
+
+def print_report_header(drcc, tenancy=False):
+    print(format_report_header(drcc, tenancy))
+
+def format_report_row(row, drcc):
+
+    """
+    Formats a result row using the report header column widths.
+    """
+
+    line = f"{row['tenancy']:<25} " if row['tenancy'] else ""
+    line += (f"{row['region']:<20} {row['availability_domain']:<30} {row['fault_domain'] or '-':<20} {row['shape']:<25} "
+             f"{row['ocpus']:<10} {row['memory']:<10}")
+    if drcc:
+        available_count = row['available_count'] if row['available_count'] else '-'
+        line += f" {available_count:^16}"
+    line += f" {row['availability_status']}"
+    if row.get('cache_age') is not None:
+        line += f" (cached {int(row['cache_age'])}s)"
+
+    return line
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Build OCI compute capacity report request
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+@traced
+def build_report_details(availability_domain, fault_domain, compartment_id, shape_info, shape_name, shape_ocpus=None, shape_memory=None, shape_is_flex=False):
+
+    """
+    Builds the compute capacity report request for a shape in an availability domain and fault domain.
+    Returns the request details and the oCPU and memory values to display.
+    """
+
     # Predefined DenseIO flexible shape configurations
     DENSEIO_SHAPE_CONFIGS = {
         "VM.DenseIO.E4.Flex": {
@@ -371,30 +702,182 @@ def create_and_print_report(region, identity_client, core_client, availability_d
         ]
     )
 
-    try:
-        report = core_client.create_compute_capacity_report(create_compute_capacity_report_details=report_details)
+    return report_details, shape_ocpus, shape_memory
 
-        # Step 3: Print capacity results
-        for result in report.data.shape_availabilities:
-            available_count = f"{result.available_count:^16}" if result.available_count else f"{'-':^16}"
-    
-            if drcc:
-                print(f"{region:<20} {availability_domain:<30} {fault_domain:<20} {shape_name:<25} "
-                      f"{shape_ocpus:<10} {shape_memory:<10} {available_count} {result.availability_status}")
-            else:
-                print(f"{region:<20} {availability_domain:<30} {fault_domain:<20} {shape_name:<25} "
-                      f"{shape_ocpus:<10} {shape_memory:<10} {result.availability_status}")
-
-    except oci.exceptions.ServiceError as e:
-        if "Authorization failed" in e.message:
-            compartment_name = get_compartment_name(identity_client, compartment_id)
-            print_error(
-                e.message,
-                f"Please verify that you have the appropriate access to {compartment_name}",
-                "You can restart the script without Admin rights",
-                "or, use the '-compartment' argument."
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Query capacity for one availability domain and fault domain
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+@traced
+def query_capacity_cell(region, core_client, availability_domain, fault_domain, compartment_id, shape_info, shape_name, shape_ocpus=None, shape_memory=None, shape_is_flex=False, tenancy_name=None, tenancy_id=None):
+
+    """
+    Returns the capacity result rows for a shape in an availability domain and fault domain, without printing.
+    OCI service errors are raised to the caller.
+    """
+
+    # Build the compute capacity report request
+    report_details, shape_ocpus, shape_memory = build_report_details(
+        availability_domain,
+        fault_domain,
+        compartment_id,
+        shape_info,
+        shape_name,
+        shape_ocpus,
+        shape_memory,
+        shape_is_flex
+    )
+
+    key = cache_key(tenancy_id, compartment_id, region, availability_domain, fault_domain, shape_name, shape_ocpus, shape_memory)
+    results, cache_age = get_capacity_results(core_client, report_details, key)
+
+    return [
+        {
+            'tenancy': tenancy_name,
+            'region': region,
+            'availability_domain': availability_domain,
+            'fault_domain': fault_domain,
+            'shape': shape_name,
+            'ocpus': shape_ocpus,
+            'memory': shape_memory,
+            'available_count': result['available_count'],
+            'availability_status': result['availability_status'],
+            'cache_age': cache_age
+        }
+        for result in results
+    ]
+
+def abandoned_cell_row(region, availability_domain, fault_domain, shape_name, shape_ocpus, shape_memory, tenancy_name, status):
+
+    """
+    Returns the result row of a cell abandoned before its answer, with a TIMED_OUT or CANCELLED status,
+    of a cell pruned by the limits pre-check, with a LIMITED status, or of a failed job cell, with an ERROR status.
+    """
+
+    return {
+        'tenancy': tenancy_name,
+        'region': region,
+        'availability_domain': availability_domain,
+        'fault_domain': fault_domain,
+        'shape': shape_name,
+        'ocpus': shape_ocpus or '-',
+        'memory': shape_memory or '-',
+        'available_count': None,
+        'availability_status': status,
+        'cache_age': None
+    }
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Query capacity without printing
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+@traced
+def query_region_capacity(region_name, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, deadline=None):
+
+    """
+    Returns the capacity result rows of every availability domain and fault domain of a region.
+    Clients, availability domains, fault domains and shapes come from the in-memory caches.
+    Cells still pending when the region deadline (bounded by deadline) expires, or is cancelled,
+    are returned as TIMED_OUT or CANCELLED rows.
+    """
+
+    region_deadline = new_region_deadline(deadline)
+
+    # Requests sent while querying the region, cells included, are bounded by its deadline
+    with deadline_scope(region_deadline):
+        config = dict(config, region=region_name)
+        identity_client = get_identity_client(config, signer)
+        core_client = get_compute_client(config, signer)
+
+        availability_domains, shapes_in_region = fetch_shapes_and_domains(core_client, identity_client, config['tenancy'], region_name)
+        shape_ocpus, shape_memory, shape_is_flex, shape_info = get_shape_config(user_shape_name, shapes_in_region, user_shape_ocpus, user_shape_memory)
+
+        # Availability domains where limits or quotas leave nothing to launch are not queried
+        limited_domains = limited_availability_domains(config, signer, compartment_id, region_name, user_shape_name, availability_domains)
+        limited_rows = [
+            abandoned_cell_row(region_name, availability_domain, None, user_shape_name, shape_ocpus, shape_memory, None, 'LIMITED')
+            for availability_domain in availability_domains
+            if availability_domain in limited_domains
+        ]
+        availability_domains = [availability_domain for availability_domain in availability_domains if availability_domain not in limited_domains]
+
+        def query_cells(cells):
+
+            # Query all cells concurrently so cells of the same availability domain are batched
+            futures = [
+                cell_executor.submit(
+                    region_deadline.call,
+                    query_capacity_cell,
+                    region_name,
+                    core_client,
+                    availability_domain,
+                    fault_domain,
+                    compartment_id,
+                    shape_info,
+                    user_shape_name,
+                    shape_ocpus,
+                    shape_memory,
+                    shape_is_flex,
+                    None,
+                    config['tenancy']
                 )
-            raise SystemExit(1)
-        else:
-            print_error(e.message)
-            raise RestartFlowException
+                for availability_domain, fault_domain in cells
+            ]
+
+            cells_rows = []
+            for future, (availability_domain, fault_domain) in zip(futures, cells):
+                try:
+                    cells_rows += region_deadline.result(future)
+                except FuturesTimeoutError:
+                    future.cancel()
+                    cells_rows.append(abandoned_cell_row(region_name, availability_domain, fault_domain, user_shape_name, shape_ocpus, shape_memory, None, region_deadline.status))
+
+            return cells_rows
+
+        def fault_domain_cells(availability_domain):
+            return [
+                (availability_domain, fault_domain)
+                for fault_domain in get_cached_fault_domains(identity_client, config['tenancy'], region_name, availability_domain)
+            ]
+
+        if not query_mode_settings['ad_level']:
+            return limited_rows + query_cells([cell for availability_domain in availability_domains for cell in fault_domain_cells(availability_domain)])
+
+        # Availability domain level, then fault domains of the availability domains needing detail,
+        # their rows replacing the availability domain row so capacity is never counted twice
+        rows = query_cells([(availability_domain, None) for availability_domain in availability_domains])
+        detailed_domains = {
+            availability_domain
+            for availability_domain in availability_domains
+            if needs_fault_domain_detail([row for row in rows if row['availability_domain'] == availability_domain])
+        } if not region_deadline.expired() else set()
+        rows = [row for row in rows if row['availability_domain'] not in detailed_domains]
+        detail_cells = [
+            cell
+            for availability_domain in availability_domains
+            if availability_domain in detailed_domains
+            for cell in fault_domain_cells(availability_domain)
+        ]
+
+        return limited_rows + rows + query_cells(detail_cells)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Capacity report errors
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def handle_report_error(e, identity_client, compartment_id):
+
+    """
+    Reports a capacity report service error, then exits on authorization failures
+    or restarts the flow for any other error.
+    """
+
+    if "Authorization failed" in e.message:
+        compartment_name = get_compartment_name(identity_client, compartment_id)
+        print_error(
+            e.message,
+            f"Please verify that you have the appropriate access to {compartment_name}",
+            "You can restart the script without Admin rights",
+            "or, use the '-compartment' argument."
+            )
+        raise SystemExit(1)
+    else:
+        print_error(e.message)
+        raise RestartFlowException
@@ -0,0 +1,228 @@
+# coding: utf-8
+
+import os
+import copy
+import gzip
+import json
+import time
+import atexit
+import tempfile
+import threading
+import oci
+from oci._vendor import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+from modules.utils import path_expander, print_error
+from modules.cache import set_cache_dir
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Record and replay OCI API responses
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+cassette_settings = {'cassette': None}
+
+class Cassette:
+
+    """
+    Holds the HTTP interactions of a run, keyed by method, URL, query parameters and body.
+    Saved as gzip compressed JSON. In replay mode, identical requests get the recorded
+    responses in order, the last one being repeated, and latency is either the recorded
+    one ('recorded') or a fixed number of milliseconds.
+    """
+
+    def __init__(self, path, mode, latency=None):
+        self.path = path_expander(path)
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.session = {}
+        self.interactions = {}
+        self.positions = {}
+
+        if mode == 'replay':
+            try:
+                with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+                    content = json.load(cassette_file)
+                self.session = content['session']
+                self.interactions = content['interactions']
+                if 'tenancy' not in self.session:
+                    raise KeyError('session')
+            except (OSError, ValueError, KeyError) as e:
+                print_error("Cassette error:", self.path, e)
+                raise SystemExit(1)
+
+    def record(self, key, response, elapsed):
+        with self.lock:
+            self.interactions.setdefault(key, []).append({
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'body': response.content.decode('utf-8', errors='replace'),
+                'elapsed': round(elapsed, 4)
+            })
+
+    def play(self, key):
+        with self.lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                return None
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            return recorded[min(position, len(recorded) - 1)]
+
+    def save(self):
+
+        # Runs ended before authentication cannot be replayed
+        if not self.session:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw_file, gzip.open(raw_file, 'wt', encoding='utf-8') as cassette_file:
+            with self.lock:
+                json.dump({'version': 1, 'session': self.session, 'interactions': self.interactions}, cassette_file)
+        os.replace(tmp_path, self.path)
+
+def interaction_key(method, url, params=None, data=None):
+
+    """
+    Builds the lookup key of a request, independent of signing headers and request ids.
+    The cells of a capacity report are sorted, their order depends on which thread queued them first.
+    """
+
+    if data:
+        try:
+            content = json.loads(data)
+            if isinstance(content, dict) and isinstance(content.get('shapeAvailabilities'), list):
+                content['shapeAvailabilities'] = sorted(content['shapeAvailabilities'], key=lambda cell: json.dumps(cell, sort_keys=True))
+            data = json.dumps(content, sort_keys=True)
+        except (TypeError, ValueError):
+            data = str(data)
+
+    query = '&'.join(f"{name}={value}" for name, value in sorted((params or {}).items()) if value is not None)
+    return f"{method.upper()} {url}?{query} {data or ''}"
+
+def build_response(interaction, url):
+    response = requests.Response()
+    response.status_code = interaction['status']
+    response.headers = requests.structures.CaseInsensitiveDict(interaction['headers'])
+    response._content = interaction['body'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+class CassetteSession:
+
+    """
+    Stands in for the HTTP session of an OCI client: records the real responses,
+    or replays them without any network access.
+    """
+
+    def __init__(self, cassette, session):
+        self.cassette = cassette
+        self.session = session
+
+    def __getattr__(self, name):
+        # Never delegated: looked up before __init__ ran, e.g. by copy.copy()
+        if name == 'session' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __copy__(self):
+        # The SDK replaces its session by a copy on some errors (e.g. 412, 413)
+        return CassetteSession(self.cassette, copy.copy(self.session))
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        key = interaction_key(method, url, params, data)
+
+        if self.cassette.mode == 'record':
+            start_time = time.time()
+            response = self.session.request(method, url, params=params, data=data, **kwargs)
+            self.cassette.record(key, response, time.time() - start_time)
+            return response
+
+        interaction = self.cassette.play(key)
+        if interaction is None:
+            # Surfaces as a regular OCI service error
+            interaction = {
+                'status': 404,
+                'headers': {'content-type': 'application/json'},
+                'body': json.dumps({'code': 'CassetteMiss', 'message': f"No recorded response for {method} {url}"}),
+                'elapsed': 0
+            }
+
+        if self.cassette.latency == 'recorded':
+            time.sleep(interaction['elapsed'])
+        elif self.cassette.latency:
+            time.sleep(float(self.cassette.latency) / 1000)
+
+        return build_response(interaction, url)
+
+class ReplaySigner(oci.auth.signers.SecurityTokenSigner):
+
+    """
+    Signer used in replay mode, requests are never sent so they are not signed.
+    Built on a throwaway key, so the SDK accepts it without any key in the config.
+    """
+
+    def __init__(self):
+        super().__init__('replay', rsa.generate_private_key(public_exponent=65537, key_size=2048))
+
+    def __call__(self, request, enforce_content_headers=True):
+        return request
+
+    @property
+    def without_content_headers(self):
+        return self
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Cassette lifecycle
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def start_cassette(path, mode, latency=None):
+
+    """
+    Activates recording or replay for every client created afterwards.
+    Runs use an empty temporary cache directory, removed at exit, so recorded and replayed runs
+    send the same requests. A recorded cassette is saved when the script exits.
+    """
+
+    cassette = Cassette(path, mode, latency)
+    cassette_settings['cassette'] = cassette
+
+    cache_dir = tempfile.TemporaryDirectory(prefix='OCI_ComputeCapacityReport_')
+    set_cache_dir(cache_dir.name)
+    atexit.register(cache_dir.cleanup)
+
+    if mode == 'record':
+        atexit.register(cassette.save)
+
+    return cassette
+
+def attach_cassette(client):
+
+    """
+    Routes the HTTP requests of a client through the active cassette, if any.
+    """
+
+    cassette = cassette_settings['cassette']
+    if cassette:
+        client.base_client.session = CassetteSession(cassette, client.base_client.session)
+
+    return client
+
+def record_session(config, auth_name, details):
+
+    """
+    Stores the non secret part of the authenticated session in the cassette.
+    """
+
+    cassette = cassette_settings['cassette']
+    if cassette and cassette.mode == 'record':
+        cassette.session = {'tenancy': config['tenancy'], 'region': config['region'], 'auth_name': auth_name, 'details': details}
+
+def replay_session():
+
+    """
+    Returns the recorded (config, signer, auth_name, details) used in place of authentication.
+    """
+
+    session = cassette_settings['cassette'].session
+    config = {'tenancy': session['tenancy'], 'region': session['region']}
+
+    return config, ReplaySigner(), session.get('auth_name', 'replay'), session.get('details', 'cassette')
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+import oci
+import threading
+from modules.cassette import attach_cassette
+from modules.deadline import DeadlineSession
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Create OCI service clients
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+client_factory_settings = {'factory': None}
+
+def set_client_factory(factory):
+
+    """
+    Replaces the creation of every OCI client by factory(client_class, config, signer), e.g. fake clients
+    in the tests. None restores the SDK clients.
+    """
+
+    client_factory_settings['factory'] = factory
+
+def create_client(client_class, config, signer):
+
+    """
+    Creates a client, routed through the record/replay cassette when one is active.
+    Every OCI client of the script is created here, the timeout of each request being bounded
+    by the deadline of the thread sending it.
+    """
+
+    if client_factory_settings['factory']:
+        return client_factory_settings['factory'](client_class, config, signer)
+
+    client = attach_cassette(client_class(config=config, signer=signer))
+    client.base_client.session = DeadlineSession(client.base_client.session)
+
+    return client
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Pool of OCI service clients
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+client_pool = {}
+client_pool_lock = threading.Lock()
+
+def get_client(client_class, config, signer):
+
+    """
+    Returns a client of the given class for the config region, created once per
+    (client class, tenancy, region, signer) and then shared by all callers.
+    """
+
+    key = (client_class.__name__, config.get('tenancy'), config['region'], id(signer))
+
+    with client_pool_lock:
+        client = client_pool.get(key)
+        if client is None:
+            client = create_client(client_class, dict(config), signer)
+            client_pool[key] = client
+
+    return client
+
+def get_identity_client(config, signer):
+    return get_client(oci.identity.IdentityClient, config, signer)
+
+def get_compute_client(config, signer):
+    return get_client(oci.core.ComputeClient, config, signer)
+
+def get_limits_client(config, signer):
+    return get_client(oci.limits.LimitsClient, config, signer)
+
+def clear_client_pool():
+
+    """
+    Drops every pooled client, e.g. after the signer was replaced.
+    """
+
+    with client_pool_lock:
+        client_pool.clear()
@@ -0,0 +1,162 @@
+# coding: utf-8
+
+import threading
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Coalesce identical concurrent calls
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class SingleFlight:
+
+    """
+    Runs a single call per key at a time: concurrent callers asking for the same key
+    wait for the call already in flight and share its result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def do(self, key, function, *args, **kwargs):
+
+        with self.lock:
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.in_flight[key] = call
+
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = function(*args, **kwargs)
+            except BaseException as e:
+                call['error'] = e
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                call['done'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+
+        return call['result']
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Merge capacity report cells of the same availability domain
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def shape_availability_key(shape_availability):
+
+    """
+    Identifies a requested or returned shape availability by shape, fault domain and shape config.
+    """
+
+    shape_config = shape_availability.instance_shape_config
+    ocpus = float(shape_config.ocpus) if shape_config and shape_config.ocpus else None
+    memory = float(shape_config.memory_in_gbs) if shape_config and shape_config.memory_in_gbs else None
+
+    return (shape_availability.instance_shape, shape_availability.fault_domain, ocpus, memory)
+
+class CapacityBatcher:
+
+    """
+    Collects single-cell capacity report requests targeting the same compartment and availability domain 
+    during a short window, and sends them as one request with several shape availabilities.
+    Each caller gets back the results matching its own cell.
+    """
+
+    def __init__(self, send_function, window=0.02, max_batch_size=20):
+        self.send_function = send_function
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def fetch(self, core_client, report_details):
+
+        # Batching disabled: send the request as is
+        if self.window <= 0:
+            return self.send_function(core_client, report_details)
+
+        group_key = (id(core_client), report_details.compartment_id, report_details.availability_domain)
+        slot = {
+            'done': threading.Event(),
+            'item': report_details.shape_availabilities[0],
+            'results': None,
+            'error': None
+        }
+
+        with self.lock:
+            group = self.pending.get(group_key)
+            leader = group is None
+            if leader:
+                group = {'slots': [], 'full': threading.Event()}
+                self.pending[group_key] = group
+
+            group['slots'].append(slot)
+            if len(group['slots']) >= self.max_batch_size:
+                # Close the group, the leader sends it right away
+                del self.pending[group_key]
+                group['full'].set()
+
+        if leader:
+            group['full'].wait(self.window)
+            with self.lock:
+                if self.pending.get(group_key) is group:
+                    del self.pending[group_key]
+            self.flush(core_client, report_details, group['slots'])
+
+        slot['done'].wait()
+        if slot['error'] is not None:
+            raise slot['error']
+
+        return slot['results']
+
+    def flush(self, core_client, report_details, slots):
+
+        # Send each distinct cell once
+        items = {}
+        for slot in slots:
+            items.setdefault(shape_availability_key(slot['item']), slot['item'])
+
+        # Results without their shape config can only be matched on shape and fault domain,
+        # so cells sharing both are sent in separate requests
+        batches = []
+        for key in items:
+            batch = next((batch for batch in batches if key[:2] not in batch), None)
+            if batch is None:
+                batch = {}
+                batches.append(batch)
+            batch[key[:2]] = key
+
+        for batch in batches:
+            keys = list(batch.values())
+            batch_slots = [slot for slot in slots if shape_availability_key(slot['item']) in keys]
+            self.send_batch(core_client, report_details, [items[key] for key in keys], batch_slots)
+
+    def send_batch(self, core_client, report_details, batch_items, slots):
+
+        try:
+            batch_details = type(report_details)(
+                compartment_id=report_details.compartment_id,
+                availability_domain=report_details.availability_domain,
+                shape_availabilities=batch_items
+            )
+            results = self.send_function(core_client, batch_details)
+
+            # Match results to cells on the full key, then on shape and fault domain when a single result is left
+            for slot in slots:
+                slot_key = shape_availability_key(slot['item'])
+                matches = [result for result in results if shape_availability_key(result) == slot_key]
+                if not matches:
+                    candidates = [result for result in results if shape_availability_key(result)[:2] == slot_key[:2]]
+                    matches = candidates if len(candidates) == 1 else []
+                slot['results'] = matches
+
+        except BaseException as e:
+            for slot in slots:
+                slot['error'] = e
+
+        finally:
+            for slot in slots:
+                slot['done'].set()
@@ -0,0 +1,158 @@
+# coding: utf-8
+
+import json
+import time
+import base64
+import threading
+import oci
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Token expiry
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def token_expiry(token):
+
+    """
+    Returns the expiry time (epoch seconds) of a JWT token, without verifying it, or None if it cannot be read.
+    """
+
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def read_delegation_token(delegation_token_location):
+    with open(delegation_token_location, 'r') as delegation_token_file:
+        return delegation_token_file.read().strip()
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Managed signer
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class ManagedSigner(oci.auth.signers.InstancePrincipalsSecurityTokenSigner):
+
+    """
+    Proxy signer handed to every client in place of the signer of the authentication method.
+    A background thread refreshes the security token shortly before it expires, and for CloudShell
+    re-reads the delegation token file, building a new signer when the token was rotated.
+    Pooled clients keep the proxy, so they all sign with the refreshed credentials at once,
+    and requests never wait on a token refresh.
+
+    It subclasses InstancePrincipalsSecurityTokenSigner only because the SDK retries a request
+    rejected with a 401 after refresh_security_token() for instance principals signers alone
+    (BaseClient.is_instance_principal_or_resource_principal_signer is an isinstance check).
+    The base class is never initialized: every method it defines is overridden below and
+    delegates to the current signer, other attributes are read from it by __getattr__.
+    """
+
+    def __init__(self, signer, delegation_token_location=None, refresh_margin=300, retry_interval=30):
+        self.signer = signer
+        self.delegation_token_location = delegation_token_location
+        self.delegation_token = getattr(signer, 'delegation_token', None)
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.last_error = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.refresh_loop, name='signer-refresh', daemon=True)
+
+    def __getattr__(self, name):
+        # region, tenancy_id... of the current signer
+        if name == 'signer':
+            raise AttributeError(name)
+        return getattr(self.signer, name)
+
+    # Signer methods of the base classes, all delegated to the current signer
+    def __call__(self, request, enforce_content_headers=True):
+        return self.signer(request, enforce_content_headers)
+
+    @property
+    def without_content_headers(self):
+        return self.signer.without_content_headers
+
+    def do_request_sign(self, request, enforce_content_headers=True):
+        return self.signer.do_request_sign(request, enforce_content_headers)
+
+    def validate_request(self, request):
+        return self.signer.validate_request(request)
+
+    def create_signers(self, *args, **kwargs):
+        return self.signer.create_signers(*args, **kwargs)
+
+    def initialize_and_return_region(self):
+        return self.signer.initialize_and_return_region()
+
+    def refresh_security_token(self):
+        self.refresh()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def expires_at(self):
+
+        """
+        Returns the expiry time of the current security token, or of the delegation token when earlier.
+        """
+
+        expiries = []
+
+        federation_client = getattr(self.signer, 'federation_client', None)
+        security_token = getattr(federation_client, 'security_token', None)
+        if security_token is not None:
+            expiries.append(security_token.jwt['exp'])
+
+        if self.delegation_token:
+            expiries.append(token_expiry(self.delegation_token))
+
+        expiries = [expiry for expiry in expiries if expiry]
+        return min(expiries) if expiries else None
+
+    def refresh(self):
+
+        """
+        Refreshes the credentials now: a rotated delegation token gets a new signer,
+        otherwise the security token of the current signer is renewed.
+        """
+
+        if self.delegation_token_location:
+            delegation_token = read_delegation_token(self.delegation_token_location)
+            if delegation_token != self.delegation_token:
+                # Replaced in a single assignment, in-flight requests finish with the previous signer
+                self.signer = oci.auth.signers.InstancePrincipalsDelegationTokenSigner(delegation_token=delegation_token)
+                self.delegation_token = delegation_token
+                return
+
+        self.signer.refresh_security_token()
+
+    def refresh_loop(self):
+        while not self.stop_event.is_set():
+            expires_at = self.expires_at()
+            wait = self.retry_interval if expires_at is None else expires_at - self.refresh_margin - time.time()
+
+            if self.stop_event.wait(max(self.retry_interval if self.last_error else 10, wait)):
+                return
+
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # The SDK still refreshes an expired token on the next request
+                self.last_error = e
+
+def manage_signer(signer, auth_name, details):
+
+    """
+    Wraps the signer of token based authentication methods (instance principals, CloudShell delegation token)
+    in a ManagedSigner refreshing it in the background. API key signers never expire and are returned as is.
+    """
+
+    if auth_name == 'instance_principals':
+        return ManagedSigner(signer).start()
+
+    if auth_name == 'delegation_token':
+        return ManagedSigner(signer, delegation_token_location=details).start()
+
+    return signer
@@ -0,0 +1,195 @@
+# coding: utf-8
+
+import copy
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import oci
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Sweep and region deadlines
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+deadline_settings = {'timeout': None, 'region_timeout': None}
+
+def set_timeouts(timeout=None, region_timeout=None):
+
+    """
+    Sets the global sweep deadline and the per-region deadline, in seconds. None or 0 disables them.
+    """
+
+    deadline_settings['timeout'] = timeout or None
+    deadline_settings['region_timeout'] = region_timeout or None
+
+class Deadline:
+
+    """
+    A point in time after which remaining work is abandoned, optionally bounded by a parent deadline.
+    Cancelling a deadline (e.g. on Ctrl-C) expires it and every child deadline immediately.
+    """
+
+    def __init__(self, seconds=None, parent=None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.parent = parent
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set() or bool(self.parent and self.parent.cancelled)
+
+    def remaining(self):
+
+        """
+        Returns the seconds left, 0 once expired or cancelled, or None without limit.
+        """
+
+        if self.cancelled:
+            return 0
+
+        remaining = None if self.expires_at is None else max(0, self.expires_at - time.monotonic())
+        parent_remaining = self.parent.remaining() if self.parent else None
+
+        if remaining is None:
+            return parent_remaining
+        if parent_remaining is None:
+            return remaining
+        return min(remaining, parent_remaining)
+
+    def expired(self):
+        return self.remaining() == 0
+
+    def result(self, future, poll_interval=0.1):
+
+        """
+        Returns the result of a future, or raises TimeoutError once the deadline expires or is cancelled.
+        Waits in short slices so a cancellation is noticed without waiting for the future.
+        """
+
+        while True:
+            remaining = self.remaining()
+            if remaining == 0 and not future.done():
+                raise FuturesTimeoutError()
+            try:
+                return future.result(timeout=poll_interval if remaining is None else min(remaining, poll_interval))
+            except FuturesTimeoutError:
+                continue
+
+    def call(self, function, *args, **kwargs):
+
+        """
+        Calls function with this deadline bounding the OCI requests it sends, e.g. on an executor thread.
+        """
+
+        with deadline_scope(self):
+            return function(*args, **kwargs)
+
+    @property
+    def status(self):
+
+        """
+        Availability status reported for the cells abandoned because of this deadline.
+        """
+
+        return 'CANCELLED' if self.cancelled else 'TIMED_OUT'
+
+def new_sweep_deadline():
+    return Deadline(deadline_settings['timeout'])
+
+def new_region_deadline(sweep_deadline):
+    return Deadline(deadline_settings['region_timeout'], sweep_deadline)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Bound OCI requests by the current deadline
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+deadline_context = threading.local()
+
+@contextmanager
+def deadline_scope(deadline):
+
+    """
+    Makes deadline the current deadline of the thread, bounding the timeouts and retries
+    of the OCI requests sent by the thread within the block.
+    """
+
+    previous = getattr(deadline_context, 'deadline', None)
+    deadline_context.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        deadline_context.deadline = previous
+
+def remaining_time():
+
+    """
+    Returns the seconds left to the current deadline of the thread, or None without deadline.
+    """
+
+    deadline = getattr(deadline_context, 'deadline', None)
+    return deadline.remaining() if deadline else None
+
+def bind_deadline(function):
+
+    """
+    Returns function bound to the current deadline of the calling thread, to run it on an executor thread.
+    """
+
+    deadline = getattr(deadline_context, 'deadline', None)
+    return functools.partial(deadline.call, function) if deadline else function
+
+def deadline_call_kwargs():
+
+    """
+    Returns the keyword arguments of an OCI call bounding its retries by the time left,
+    or no argument without deadline, keeping the retry strategy of the client.
+    """
+
+    remaining = remaining_time()
+    if remaining is None:
+        return {}
+
+    if remaining <= 1:
+        return {'retry_strategy': oci.retry.NoneRetryStrategy()}
+
+    return {'retry_strategy': oci.retry.RetryStrategyBuilder(
+        total_elapsed_time_check=True,
+        total_elapsed_time_seconds=int(remaining)
+    ).get_retry_strategy()}
+
+class DeadlineSession:
+
+    """
+    Stands in for the HTTP session of an OCI client: the timeout of each request is bounded
+    by the time left to the current deadline of the sending thread, so pooled clients shared
+    by regions with different deadlines never wait past them.
+    """
+
+    def __init__(self, session, connect_timeout=10):
+        self.session = session
+        self.connect_timeout = connect_timeout
+
+    def __getattr__(self, name):
+        # Never delegated: looked up before __init__ ran, e.g. by copy.copy()
+        if name == 'session' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __copy__(self):
+        # The SDK replaces its session by a copy on some errors (e.g. 412, 413)
+        return DeadlineSession(copy.copy(self.session), self.connect_timeout)
+
+    def request(self, method, url, **kwargs):
+        remaining = remaining_time()
+        if remaining is not None:
+            # An expired deadline still lets the request fail fast instead of blocking
+            remaining = max(remaining, 0.1)
+            timeout = kwargs.get('timeout')
+            connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            kwargs['timeout'] = (
+                min(connect_timeout or self.connect_timeout, self.connect_timeout, remaining),
+                min(read_timeout, remaining) if read_timeout else remaining
+            )
+        return self.session.request(method, url, **kwargs)
@@ -0,0 +1,100 @@
+# coding: utf-8
+
+import os
+import gzip
+import json
+import time
+import tempfile
+from modules.utils import print_error
+from modules.cache import get_cache_dir
+from modules.results import ResultTable
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Retain sweep results
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+history_settings = {'retention_days': 0}
+
+def set_history_retention(days):
+
+    """
+    Sets the number of days sweep results are retained in the local history, 0 disables it.
+    """
+
+    history_settings['retention_days'] = max(0, days or 0)
+
+def record_history(rows):
+
+    """
+    Appends the results of a sweep to the local history as one compressed columnar chunk,
+    then removes the chunks older than the retention period.
+    Only real capacity answers are retained: rows served from the capacity cache were already
+    recorded when observed, and LIMITED, TIMED_OUT and CANCELLED cells were never asked.
+    """
+
+    retention_days = history_settings['retention_days']
+    if not retention_days:
+        return
+
+    table = ResultTable(
+        row for row in rows
+        if row.get('cache_age') is None and row['availability_status'] not in ('LIMITED', 'TIMED_OUT', 'CANCELLED')
+    )
+    if not len(table):
+        return
+
+    try:
+        history_dir = get_cache_dir('history')
+        observed_at = time.time()
+
+        fd, tmp_path = tempfile.mkstemp(dir=history_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw_file, gzip.open(raw_file, 'wt', encoding='utf-8') as chunk_file:
+            json.dump({'version': 1, 'observed_at': observed_at, 'table': table.to_columns()}, chunk_file)
+        os.replace(tmp_path, os.path.join(history_dir, f"{time.time_ns()}.json.gz"))
+
+        prune_history(history_dir, observed_at - retention_days * 86400)
+
+    except OSError as e:
+        # History is a side output, it must never break a run
+        print_error("History error:", e, level='INFO')
+
+def history_chunks(history_dir):
+
+    """
+    Returns (observed_at, file name) for every history chunk, oldest first.
+    Chunk file names are their creation time in nanoseconds.
+    """
+
+    chunks = []
+    for file_name in os.listdir(history_dir):
+        if file_name.endswith('.json.gz') and file_name[:-len('.json.gz')].isdigit():
+            chunks.append((int(file_name[:-len('.json.gz')]) / 1e9, file_name))
+
+    return sorted(chunks)
+
+def prune_history(history_dir, cutoff):
+    for observed_at, file_name in history_chunks(history_dir):
+        if observed_at < cutoff:
+            try:
+                os.remove(os.path.join(history_dir, file_name))
+            except OSError:
+                pass
+
+def load_history(max_age_days=None):
+
+    """
+    Yields (observed_at, ResultTable) for every retained sweep, oldest first,
+    optionally limited to the last max_age_days days. Unreadable chunks are skipped.
+    """
+
+    history_dir = get_cache_dir('history')
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else 0
+
+    for observed_at, file_name in history_chunks(history_dir):
+        if observed_at < cutoff:
+            continue
+        try:
+            with gzip.open(os.path.join(history_dir, file_name), 'rt', encoding='utf-8') as chunk_file:
+                content = json.load(chunk_file)
+            yield content['observed_at'], ResultTable.from_columns(content['table'])
+        except (OSError, ValueError, KeyError):
+            continue
@@ -2,8 +2,17 @@
 
 import oci
 import os
+import time
+import socket
+import threading
+import configparser
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from modules.utils import clear, green, yellow, red, print_error, print_info
+from modules.cache import cache_key, read_cache, write_cache
+from modules.clients import create_client
+from modules.stream import page_records
+from modules.coalesce import SingleFlight
+from modules.trace import traced
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # set custom retry strategy
@@ -44,10 +53,13 @@ def retry_auth():
     else:
         raise SystemExit("\nAll authentication methods have failed...\n")
 
+@traced
 def init_authentication(user_auth, config_file_path, config_profile):
 
     """
     Initializes authentication based on user preference or tries multiple methods.
+    Without user preference, the method that succeeded last time in this environment is tried first,
+    without any precondition check, then every method passing its local precondition checks is tried concurrently.
     """
     authentication_errors = {}
 
@@ -58,16 +70,43 @@ def init_authentication(user_auth, config_file_path, config_profile):
         'ip': (authenticate_instance_principals, [])
     }
 
-    # If user_auth is specified, limit the methods to the chosen one; otherwise, try all
-    methods_to_try = [auth_methods[user_auth]] if user_auth else list(auth_methods.values())
-
-    # Try each authentication method until one succeeds
-    for auth_method, args in methods_to_try:
+    # If user_auth is specified, only try the chosen method
+    if user_auth:
+        print_auth_progress([user_auth])
+        auth_method, args = auth_methods[user_auth]
         config, signer, tenancy_name, auth_name, details = auth_method(authentication_errors, *args)
 
         if config:
             return config, signer, tenancy_name, auth_name, details
 
+    else:
+        # Try the method cached for this environment first, the preconditions (e.g. the metadata
+        # service probe) are only paid when falling back to the race
+        environment_key = get_auth_environment_key(config_file_path, config_profile)
+        cached_method, _ = read_cache('auth', environment_key)
+
+        if cached_method in auth_methods:
+            print_auth_progress([cached_method])
+            auth_method, args = auth_methods[cached_method]
+            config, signer, tenancy_name, auth_name, details = auth_method(authentication_errors, *args)
+
+            if config:
+                return config, signer, tenancy_name, auth_name, details
+
+        # Keep only the methods that can possibly succeed in this environment
+        methods_to_try = [
+            method for method in check_auth_preconditions(authentication_errors, config_file_path)
+            if method != cached_method
+        ]
+
+        # Race the remaining viable methods and keep the highest priority one to succeed
+        print_auth_progress(methods_to_try)
+        winning_method, result = race_authentication(auth_methods, methods_to_try, authentication_errors)
+
+        if winning_method:
+            write_cache('auth', environment_key, winning_method)
+            return result
+
     # If all methods fail, print the errors and exit
     print("\r", end=' ' * 100 + '\r', flush=True)
     clear()
@@ -81,6 +120,111 @@ def init_authentication(user_auth, config_file_path, config_profile):
     else:
         raise SystemExit(1)
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Probe authentication methods
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+auth_method_labels = {'cs': 'CloudShell', 'cf': 'Config File', 'ip': 'Instance Principals'}
+
+def print_auth_progress(methods):
+
+    """
+    Prints the authentication methods being tried, from the calling thread only.
+    """
+
+    if methods:
+        labels = ', '.join(auth_method_labels[method] for method in methods)
+        print(yellow(f"\r => Trying {labels} authentication..."), end=' ' * 50 + '\r', flush=True)
+
+def get_auth_environment_key(config_file_path, config_profile):
+
+    """
+    Identifies the current environment to cache the winning authentication method.
+    """
+
+    return cache_key(
+        socket.gethostname(),
+        os.path.expanduser(config_file_path),
+        config_profile,
+        os.environ.get('OCI_CONFIG_FILE'),
+        os.environ.get('OCI_CONFIG_PROFILE')
+    )
+
+def is_metadata_service_reachable(timeout=0.5):
+
+    """
+    Checks if the OCI instance metadata service answers, meaning we run on an OCI instance.
+    """
+
+    try:
+        with socket.create_connection(('169.254.169.254', 80), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def check_auth_preconditions(authentication_errors, config_file_path):
+
+    """
+    Runs cheap local checks, without any OCI API call, to find which authentication methods 
+    can possibly succeed. Returns the viable method codes in the default priority order.
+    """
+
+    viable_methods = []
+
+    # CloudShell: environment variables must point to an existing config file
+    env_config_file = os.environ.get('OCI_CONFIG_FILE')
+    env_config_section = os.environ.get('OCI_CONFIG_PROFILE')
+
+    if env_config_file and env_config_section and os.path.isfile(os.path.expanduser(env_config_file)):
+        viable_methods.append('cs')
+    else:
+        authentication_errors['CloudShell_authentication'] = (
+            f"Not a CloudShell session: $OCI_CONFIG_FILE={env_config_file}, $OCI_CONFIG_PROFILE={env_config_section}"
+        )
+
+    # Config file: the file must exist
+    if os.path.isfile(os.path.expanduser(config_file_path)):
+        viable_methods.append('cf')
+    else:
+        authentication_errors['Config_File_authentication'] = f"Config file not found: {config_file_path}"
+
+    # Instance principals: the instance metadata service must be reachable
+    if is_metadata_service_reachable():
+        viable_methods.append('ip')
+    else:
+        authentication_errors['Instance_Principals_authentication'] = "Instance metadata service unreachable: not an OCI instance"
+
+    return viable_methods
+
+def race_authentication(auth_methods, methods_to_try, authentication_errors):
+
+    """
+    Tries several authentication methods concurrently, methods_to_try being in priority order.
+    Returns the code and result of the highest priority method to succeed, or (None, None):
+    a method succeeding first waits for the higher priority ones to fail, so an environment
+    always gets the same tenancy and profile. Probes run in daemon threads, so a slow probe
+    left behind (e.g. instance principals retrying the metadata service) never holds the exit.
+    """
+
+    probes = []
+    for method in methods_to_try:
+        probe = {'done': threading.Event(), 'result': (None, None, None, None, None)}
+
+        def run_probe(probe=probe, method=method):
+            try:
+                probe['result'] = auth_methods[method][0](authentication_errors, *auth_methods[method][1])
+            finally:
+                probe['done'].set()
+
+        threading.Thread(target=run_probe, name=f"auth-{method}", daemon=True).start()
+        probes.append((method, probe))
+
+    for method, probe in probes:
+        probe['done'].wait()
+        if probe['result'][0]:
+            return method, probe['result']
+
+    return None, None
+
 def authenticate_cloud_shell(authentication_errors):
 
     """
@@ -89,8 +233,6 @@ def authenticate_cloud_shell(authentication_errors):
     """
 
     try:
-        print(yellow("\r => Trying CloudShell authentication..."), end=' ' * 50 + '\r', flush=True)
-
         # Retrieve environment variables for OCI configuration
         env_config_file = os.environ.get('OCI_CONFIG_FILE')
         env_config_section = os.environ.get('OCI_CONFIG_PROFILE')
@@ -117,7 +259,7 @@ def authenticate_cloud_shell(authentication_errors):
         signer = oci.auth.signers.InstancePrincipalsDelegationTokenSigner(delegation_token=delegation_token)
 
         # Validate the config by trying to get the tenancy_name
-        identity = oci.identity.IdentityClient(config=config, signer=signer)
+        identity = create_client(oci.identity.IdentityClient, config, signer)
         tenancy = identity.get_tenancy(config['tenancy']).data
 
         return config, signer, tenancy, 'delegation_token', delegation_token_location
@@ -134,8 +276,6 @@ def authenticate_config_file(authentication_errors, config_file_path, config_pro
     """
 
     try:
-        print(yellow(f"\r => Trying Config File authentication..."), end=' ' * 50 + '\r', flush=True)
-
         # Load OCI configuration from file
         config = oci.config.from_file(file_location=config_file_path, profile_name=config_profile)
 
@@ -153,7 +293,7 @@ def authenticate_config_file(authentication_errors, config_file_path, config_pro
         )
 
         # Validate the config by trying to get the tenancy_name
-        identity = oci.identity.IdentityClient(config=config, signer=signer)
+        identity = create_client(oci.identity.IdentityClient, config, signer)
         tenancy = identity.get_tenancy(config['tenancy']).data
 
         return config, signer, tenancy, 'config_file', config_profile
@@ -170,14 +310,12 @@ def authenticate_instance_principals(authentication_errors):
     """
 
     try:
-        print(yellow(f"\r => Trying Instance Principals authentication..."), end=' ' * 50 + '\r', flush=True)
-
         # Initialize the signer using the instance principals token
         signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner(retry_strategy=custom_retry_strategy)
         config = {'region': signer.region, 'tenancy': signer.tenancy_id}
 
         # Validate the config by trying to get the tenancy_name
-        identity = oci.identity.IdentityClient(config=config, signer=signer)
+        identity = create_client(oci.identity.IdentityClient, config, signer)
         tenancy = identity.get_tenancy(config['tenancy']).data
 
         return config, signer, tenancy, 'instance_principals', ''
@@ -186,31 +324,124 @@ def authenticate_instance_principals(authentication_errors):
         authentication_errors['Instance_Principals_authentication'] = str(e).replace("\n", "")
         return None, None, None, None, None
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Manage multi-profile authentication
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def list_config_profiles(config_file_path):
+
+    """
+    Returns every profile section defined in the OCI config file.
+    """
+
+    parser = configparser.ConfigParser(interpolation=None)
+    if not parser.read(os.path.expanduser(config_file_path)):
+        print_error("Config file error:", f"unable to read {config_file_path}")
+        raise SystemExit(1)
+
+    profiles = parser.sections()
+    if parser.defaults():
+        profiles.insert(0, 'DEFAULT')
+
+    return profiles
+
+def init_multi_authentication(config_file_path, config_profiles):
+
+    """
+    Authenticates several config file profiles concurrently.
+    Profiles failing authentication are reported and skipped, the others are returned 
+    as (config, signer, tenancy, auth_name, details) tuples, in the requested order.
+    """
+
+    authentication_errors = {profile: {} for profile in config_profiles}
+    sessions = {}
+
+    print_auth_progress(['cf'])
+    with ThreadPoolExecutor(max_workers=max(1, min(len(config_profiles), 10))) as executor:
+        futures = {
+            executor.submit(authenticate_config_file, authentication_errors[profile], config_file_path, profile): profile
+            for profile in config_profiles
+        }
+
+        for future in as_completed(futures):
+            profile = futures[future]
+            config, signer, tenancy, auth_name, details = future.result()
+
+            if config:
+                sessions[profile] = (config, signer, tenancy, auth_name, details)
+
+    print("\r", end=' ' * 100 + '\r', flush=True)
+    for profile, errors in authentication_errors.items():
+        for error in errors.values():
+            print_error(f"Profile {profile}:", error, level='INFO')
+
+    if not sessions:
+        raise SystemExit("\nAll profiles failed to authenticate...\n")
+
+    return [sessions[profile] for profile in config_profiles if profile in sessions]
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Check connectivity to OCI regions
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
+connectivity_cache_settings = {'ttl': 3600}
+
+def set_connectivity_ttl(ttl):
+
+    """
+    Sets how long (in seconds) a successful region connectivity check is reused. 0 disables the cache.
+    """
+
+    connectivity_cache_settings['ttl'] = max(0, ttl or 0)
+
 def check_region_connectivity(region, config, signer, custom_retry_strategy):
 
     """
-    Checks the connectivity to regions and returns the region if successful.
+    Checks the connectivity to regions and returns the region, the result and the round-trip time in seconds.
     """
 
     try:
-        config['region'] = region.region_name
+        config = dict(config, region=region.region_name)
         print(yellow(f"\r => Checking connectivity to region {region.region_name}..."),end=' '*50+'\r', flush=True)
 
         # Validate the connecivity by trying to get the tenancy_name
-        identity = oci.identity.IdentityClient(config=config, signer=signer)
+        identity = create_client(oci.identity.IdentityClient, config, signer)
+        start_time = time.perf_counter()
         identity.get_tenancy(config['tenancy'],retry_strategy=custom_retry_strategy).data
-        return region, True
+        return region, True, time.perf_counter() - start_time
         
     except Exception:
-        return region, False
+        return region, False, None
+
+def get_region_latencies(tenancy_id, regions):
+
+    """
+    Returns the last measured round-trip time of each region, regardless of its age.
+    Regions never measured are missing from the result.
+    """
+
+    latencies = {}
+    for region in regions:
+        connectivity, _ = read_cache('connectivity', cache_key(tenancy_id, region.region_name))
+        if connectivity:
+            latencies[region.region_name] = connectivity['latency']
+
+    return latencies
+
+def sort_regions_by_latency(tenancy_id, regions):
+
+    """
+    Orders regions from the slowest to the fastest, so a concurrent sweep starts the slowest first.
+    Regions never measured are considered the slowest.
+    """
 
+    latencies = get_region_latencies(tenancy_id, regions)
+    return sorted(regions, key=lambda region: latencies.get(region.region_name, float('inf')), reverse=True)
+
+@traced
 def validate_region_connectivity(regions, config, signer):
 
     """
     Validates the connectivity to multiple regions concurrently.
+    Regions validated less than the connectivity TTL ago are not checked again.
     """
 
     custom_retry_strategy = oci.retry.RetryStrategyBuilder(
@@ -223,17 +454,28 @@ def validate_region_connectivity(regions, config, signer):
     ).get_retry_strategy()
 
     regions_validated = []
+    regions_to_check = []
+    ttl = connectivity_cache_settings['ttl']
+
+    # Reuse recent successful checks
+    for region in regions:
+        connectivity, _ = read_cache('connectivity', cache_key(config['tenancy'], region.region_name), ttl) if ttl else (None, None)
+        if connectivity:
+            regions_validated.append(region)
+        else:
+            regions_to_check.append(region)
 
     with ThreadPoolExecutor(max_workers=10) as executor:
         # Submit all region connectivity checks concurrently
-        futures = {executor.submit(check_region_connectivity, region, config, signer, custom_retry_strategy): region for region in regions}
+        futures = {executor.submit(check_region_connectivity, region, config, signer, custom_retry_strategy): region for region in regions_to_check}
 
         # Process results as they complete
         for future in as_completed(futures):
-            region, success = future.result()
+            region, success, latency = future.result()
             
             if success:
                 regions_validated.append(region)
+                write_cache('connectivity', cache_key(config['tenancy'], region.region_name), {'latency': latency})
             else:
                 #print(f"\r", end=' ' * 50, flush=True)
                 print_info(red, 'Region', 'error', region.region_name)
@@ -241,6 +483,9 @@ def validate_region_connectivity(regions, config, signer):
                 print_info(red, 'Region', 'ignored', 'check domain replication')
 
     if regions_validated:
+        # Keep the requested region order
+        region_order = [region.region_name for region in regions]
+        regions_validated.sort(key=lambda region: region_order.index(region.region_name))
         return regions_validated
     else:
         print_error(
@@ -251,44 +496,184 @@ def validate_region_connectivity(regions, config, signer):
         raise SystemExit(1)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-# Check compartment state
+# Compartment resolver
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
-def check_compartment_state(identity_client, compartment_id):
+compartment_cache_settings = {'ttl': 3600}
+compartment_cache = {}
+compartment_lock = threading.Lock()
+compartment_trees = {}
+compartment_single_flight = SingleFlight()
+
+def build_compartment_tree(identity_client, tenancy_id):
 
     """
-    Check if a compartment is ACTIVE
+    Reads the compartment tree of the tenancy from the local cache, or lists every compartment
+    with a single paginated call and builds OCID -> {name, state, parent, path} entries.
+    Returns None when the compartments cannot be listed.
     """
 
+    key = cache_key(tenancy_id)
+    tree, _ = read_cache('compartments', key, compartment_cache_settings['ttl'])
+    if tree is not None:
+        return tree
+
     try:
-        # Retrieve compartment details from OCI using the provided compartment_id
-        compartment = identity_client.get_compartment(compartment_id).data
-
-        # Check if the compartment's lifecycle state is 'ACTIVE'
-        if compartment.lifecycle_state == 'ACTIVE':
-            # Print compartment information if it is active
-            print_info(green, 'Compartment', 'analyzed', compartment.name)
-            print_info(green, 'Compartment', 'state', compartment.lifecycle_state)
-            return
-        else:
-            # Print an error message if the compartment is not active and exit the program
-            print_error(
-                "Compartment:", 
-                compartment.name, 
-                "is in an unexpected state:", 
-                compartment.lifecycle_state
-            )
+        print(yellow(f"\r => Loading compartments..."), end=' '*50+'\r', flush=True)
+
+        # The root compartment is named after the tenancy, as shown in error messages
+        tenancy_name = identity_client.get_tenancy(tenancy_id, retry_strategy=custom_retry_strategy).data.name
+
+        # Pages are streamed, only the compact tree entries are kept
+        tree = {tenancy_id: {'name': tenancy_name, 'state': 'ACTIVE', 'parent': None}}
+        for compartment in page_records(
+            identity_client.list_compartments,
+            tenancy_id,
+            compartment_id_in_subtree=True,
+            access_level='ANY',
+            retry_strategy=custom_retry_strategy
+        ):
+            tree[compartment.id] = {
+                'name': compartment.name,
+                'state': compartment.lifecycle_state,
+                'parent': compartment.compartment_id
+            }
+
+    except (oci.exceptions.ServiceError, oci.exceptions.RequestException):
+        # Missing tenancy level rights, or the identity endpoint cannot be reached
+        return None
+
+    # Full paths, e.g. "Prod/Network", the root compartment path is "/"
+    def compartment_path(compartment_id):
+        entry = tree[compartment_id]
+        if entry['parent'] not in tree:
+            return '/' if compartment_id == tenancy_id else entry['name']
+        parent_path = compartment_path(entry['parent'])
+        return entry['name'] if parent_path == '/' else f"{parent_path}/{entry['name']}"
+
+    for compartment_id, entry in tree.items():
+        entry['path'] = compartment_path(compartment_id)
+
+    write_cache('compartments', key, tree)
+    return tree
+
+def load_compartment_tree(identity_client, tenancy_id):
+
+    """
+    Returns the compartment tree of the tenancy, kept in memory once loaded.
+    Concurrent callers share a single load per tenancy, the lock is never held while listing,
+    so lookups of other tenancies and of known compartments are not blocked.
+    Returns None when the compartments cannot be listed, e.g. without tenancy level rights.
+    """
+
+    with compartment_lock:
+        if tenancy_id in compartment_trees:
+            return compartment_trees[tenancy_id]
+
+    tree = compartment_single_flight.do(tenancy_id, build_compartment_tree, identity_client, tenancy_id)
+
+    with compartment_lock:
+        compartment_trees[tenancy_id] = tree
+        if tree:
+            compartment_cache.update(tree)
+    return tree
+
+def lookup_compartment(identity_client, compartment_id):
+
+    """
+    Returns the {name, state} entry of a compartment OCID from the resolver cache,
+    falling back to a single get_compartment call for compartments outside any loaded tree.
+    """
+
+    with compartment_lock:
+        entry = compartment_cache.get(compartment_id)
+    if entry:
+        return entry
+
+    compartment = identity_client.get_compartment(compartment_id, retry_strategy=custom_retry_strategy).data
+    entry = {'name': compartment.name, 'state': compartment.lifecycle_state, 'parent': compartment.compartment_id, 'path': compartment.name}
+
+    with compartment_lock:
+        compartment_cache[compartment_id] = entry
+    return entry
+
+def resolve_compartment(identity_client, tenancy_id, compartment):
+
+    """
+    Resolves a compartment OCID, name or path ("Prod/Network") to its OCID.
+    Names and paths are matched case-insensitively, a name shared by several compartments must be given as a path.
+    Returns None and prints the reason when the compartment cannot be resolved.
+    """
+
+    compartment = compartment.strip()
+
+    # OCIDs are checked by the caller with a single lookup
+    if compartment.startswith('ocid1.'):
+        return compartment
+
+    tree = load_compartment_tree(identity_client, tenancy_id)
+    if tree is None:
+        print(red(f"\nCompartment error: {compartment} => compartments cannot be listed, use the compartment OCID"))
+        return None
+
+    wanted = compartment.strip('/').lower()
+    key = 'path' if '/' in compartment else 'name'
+    matches = [compartment_id for compartment_id, entry in tree.items() if entry[key].lower() == wanted]
+
+    # Deleted compartments keep their name, prefer the active ones
+    active_matches = [compartment_id for compartment_id in matches if tree[compartment_id]['state'] == 'ACTIVE']
+    matches = active_matches or matches
+
+    if len(matches) == 1:
+        return matches[0]
+
+    if not matches:
+        print(red(f"\nCompartment error: {compartment} => no compartment found with this name"))
+    else:
+        print(red(f"\nCompartment error: {compartment} => several compartments match, use a path:"))
+        for compartment_id in matches:
+            print(red(f"   {tree[compartment_id]['path']}"))
+    return None
+
+def resolve_compartment_list(identity_client, tenancy_id, compartments):
+
+    """
+    Resolves a comma-separated list of compartment OCIDs, names or paths.
+    An entry ending with "/*" adds the compartment and all its active sub-compartments.
+    Returns an ordered list of unique (compartment_id, display_name) tuples, exits on any unresolved entry.
+    """
+
+    resolved = {}
+
+    for compartment in [entry.strip() for entry in compartments.split(',') if entry.strip()]:
+        subtree = compartment.endswith('/*')
+        compartment_id = resolve_compartment(identity_client, tenancy_id, compartment[:-2] if subtree else compartment)
+        if not compartment_id:
             raise SystemExit(1)
 
-    except oci.exceptions.ServiceError as e:
-        # Catch any ServiceError exceptions raised by the OCI SDK
-        # Print a detailed error message and exit the program
-        print_error(
-            "Compartment_id error:", 
-            compartment_id, 
-            e.code, 
-            e.message
-        )
-        raise SystemExit(1)
+        compartment_ids = [compartment_id]
+        if subtree:
+            tree = load_compartment_tree(identity_client, tenancy_id) or {}
+
+            def is_descendant(entry):
+                while entry and entry['parent']:
+                    if entry['parent'] == compartment_id:
+                        return True
+                    entry = tree.get(entry['parent'])
+                return False
+
+            compartment_ids += sorted(
+                (child_id for child_id, entry in tree.items() if entry['state'] == 'ACTIVE' and is_descendant(entry)),
+                key=lambda child_id: tree[child_id]['path']
+            )
+
+        for child_id in compartment_ids:
+            try:
+                resolved.setdefault(child_id, lookup_compartment(identity_client, child_id)['path'])
+            except oci.exceptions.ServiceError as e:
+                print_error("Compartment_id error:", child_id, e.code, e.message)
+                raise SystemExit(1)
+
+    return list(resolved.items())
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # get compartment name
@@ -296,12 +681,11 @@ def check_compartment_state(identity_client, compartment_id):
 def get_compartment_name(identity_client, compartment_id):
 
     """
-    retrieve compartment name from compartment ocid
+    retrieve compartment name from compartment ocid, using the resolver cache
     """
 
     try:
-        compartment_name = identity_client.get_compartment(compartment_id).data.name
-        return compartment_name
+        return lookup_compartment(identity_client, compartment_id)['name']
 
     except oci.exceptions.ServiceError as e:
         print_error("Compartment_id error:", compartment_id, e.code, e.message)
@@ -311,18 +695,22 @@ def get_compartment_name(identity_client, compartment_id):
 # Set target compartment for capacity report query
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-def validate_compartment(identity_client, compartment_id):
+def validate_compartment(identity_client, tenancy_id, compartment):
 
     """
-    Validate if the compartment is active.
+    Resolve a compartment OCID, name or path and validate that it is active.
     """
     
+    compartment_id = resolve_compartment(identity_client, tenancy_id, compartment)
+    if not compartment_id:
+        return None
+
     try:
-        compartment = identity_client.get_compartment(compartment_id).data
-        if compartment.lifecycle_state == 'ACTIVE':
+        entry = lookup_compartment(identity_client, compartment_id)
+        if entry['state'] == 'ACTIVE':
             return compartment_id
         else:
-            print(red(f"\nCompartment state error: {compartment.name} is {compartment.lifecycle_state}"))
+            print(red(f"\nCompartment state error: {entry['name']} is {entry['state']}"))
     except oci.exceptions.ServiceError as e:
         print(red(f"\nCompartment error: {compartment_id} => {e.code} - {e.message}"))
     return None
@@ -346,7 +734,7 @@ def set_user_compartment(identity_client, args, tenancy_id):
 
     # If a compartment is provided, validate it.
     if args.compartment:
-        valid_compartment = validate_compartment(identity_client, args.compartment)
+        valid_compartment = validate_compartment(identity_client, tenancy_id, args.compartment)
         if valid_compartment:
             return valid_compartment
 
@@ -364,12 +752,12 @@ def set_user_compartment(identity_client, args, tenancy_id):
 
         if user_input in {'N', 'NO'}:
             while True:
-                user_compartment = input(yellow("\nEnter a compartment OCID to which you have access or [Q]uit: ")).strip().lower()
+                user_compartment = input(yellow("\nEnter a compartment OCID, name or path to which you have access or [Q]uit: ")).strip()
 
-                if user_compartment in {'q', 'quit'}:
+                if user_compartment.lower() in {'q', 'quit'}:
                     raise SystemExit("\nQuitting the program as per user request.\n")
 
-                valid_compartment = validate_compartment(identity_client, user_compartment)
+                valid_compartment = validate_compartment(identity_client, tenancy_id, user_compartment)
                 if valid_compartment:
                     print()
                     return valid_compartment
@@ -377,27 +765,6 @@ def set_user_compartment(identity_client, args, tenancy_id):
         if user_input in {'Q', 'QUIT'}:
             raise SystemExit("\nQuitting the program as per user request.\n")
 
-# - - - - - - - - - - - - - - - - - - - - - - - - - -
-# Get home region
-# - - - - - - - - - - - - - - - - - - - - - - - - - -
-def get_home_region(identity_client, tenancy_id):
-
-    """
-    Fetches the the home region for the given tenancy.
-    """
-
-    try:
-        print(yellow(f"\r => Fectching home region..."),end=' '*50+'\r', flush=True)
-        subscribed_regions = identity_client.list_region_subscriptions(tenancy_id).data
-
-        # Return home region
-        home_region = next((region for region in subscribed_regions if region.is_home_region), None)            
-        return home_region
-
-    except oci.exceptions.ServiceError as e:
-        print_error("Fetching home region:", e)
-        raise SystemExit(1)
-     
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Get all subscribed region in the tenancy
 # - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -425,20 +792,24 @@ def get_region_subscription_list(identity_client, tenancy_id, target_region):
         # create a dictionary mapping region names to region objects
         region_map = {region.region_name.lower(): region for region in subscribed_regions}
 
-        # attempt to get the specified region
-        region = region_map.get(target_region.lower())
+        # attempt to get the specified regions, a comma separated list keeps its priority order
+        target_regions = [name.strip() for name in target_region.split(',') if name.strip()]
+        regions = [region_map.get(name.lower()) for name in target_regions]
 
-        if region:
+        if all(regions):
             print_info(green, 'Region', 'analyzed', target_region)
-            return [region]  # return the specified subscribed region as a list
+            return regions  # return the specified subscribed regions as a list
 
-        # fetch all available OCI regions if target_region is not found in subscribed regions
+        # fetch all available OCI regions if a target region is not found in subscribed regions
         oci_regions = {region.name.lower() for region in identity_client.list_regions().data}
 
-        if target_region.lower() in oci_regions:
-            print_error("Region error:", f"{target_region} is not subscribed")
-        else:
-            print_error("Region error:", f"{target_region} does not exist")
+        for name, region in zip(target_regions, regions):
+            if region:
+                continue
+            if name.lower() in oci_regions:
+                print_error("Region error:", f"{name} is not subscribed")
+            else:
+                print_error("Region error:", f"{name} does not exist")
 
         raise SystemExit(1)
 
@@ -456,18 +827,8 @@ def get_availability_domains(identity_client, tenancy_id):
     """
     
     try:
-        # Initialize an empty list to store availability domain names
-        oci_ads = []
-
-        # Use OCI pagination to retrieve all availability domains for the specified compartment
-        availability_domains = oci.pagination.list_call_get_all_results(
-            identity_client.list_availability_domains,
-            tenancy_id
-        ).data
-
-        # Extract the 'name' attribute of each availability domain and add it to the list
-        for ad in availability_domains:
-            oci_ads.append(ad.name)
+        # Stream the availability domains page by page and keep their names only
+        oci_ads = [ad.name for ad in page_records(identity_client.list_availability_domains, tenancy_id)]
 
     except oci.exceptions.ServiceError as e:
         print_error("Error in get_availability_domains:", e)
@@ -485,19 +846,8 @@ def get_fault_domains(identity_client, tenancy_id, availability_domain):
     """
 
     try:
-        # Initialize an empty list to store fault domain names
-        oci_fds=[]
-
-        # Use OCI pagination to retrieve all fault domains for the specified availability domain
-        fault_domains = oci.pagination.list_call_get_all_results(
-            identity_client.list_fault_domains,
-            tenancy_id,
-            availability_domain
-            ).data
-
-        # Extract the 'name' attribute of each fault domain and add it to the list
-        for fd in fault_domains:
-            oci_fds.append(fd.name)
+        # Stream the fault domains page by page and keep their names only
+        oci_fds = [fd.name for fd in page_records(identity_client.list_fault_domains, tenancy_id, availability_domain)]
     
     except oci.exceptions.ServiceError as e:
         print_error("Error in get_fault_domains:", e)
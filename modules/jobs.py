@@ -0,0 +1,343 @@
+# coding: utf-8
+
+import os
+import csv
+import json
+import oci
+from modules.utils import green, red, print_info, print_error, path_expander
+from modules.clients import get_identity_client, get_compute_client
+from modules.topology import get_cached_fault_domains
+from modules.stream import bounded_map
+from modules.limits import limited_availability_domains
+from modules.identity import get_region_subscription_list, validate_region_connectivity, resolve_compartment
+from modules import capacity
+from modules.capacity import (
+    fetch_shapes_and_domains, get_shape_config, query_capacity_cell, resolve_shape_request,
+    query_mode_settings, needs_fault_domain_detail, format_report_header, format_report_row, abandoned_cell_row
+)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Load the job file
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def load_job_file(job_file_path):
+
+    """
+    Loads a job file in JSON, TOML or YAML format (YAML requires PyYAML).
+    The file holds a "jobs" list and optional "defaults" applied to every job,
+    or only the list of jobs. Job names must be unique:
+
+        defaults: {region: all_regions, drcc: false}
+        jobs:
+          - {name: e5-small, shape: VM.Standard.E5.Flex, ocpus: 2, memory: 16, output: e5-small.txt}
+          - {name: a1, shape: VM.Standard.A1.Flex, region: eu-paris-1, output: a1.json}
+    """
+
+    job_file_path = path_expander(job_file_path)
+    extension = os.path.splitext(job_file_path)[1].lower()
+
+    try:
+        if extension == '.toml':
+            try:
+                import tomllib
+            except ImportError:
+                # Python < 3.11
+                try:
+                    import tomli as tomllib
+                except ImportError:
+                    print_error("TOML job files require Python 3.11 or tomli:", "python3 -m pip install tomli")
+                    raise SystemExit(1)
+            with open(job_file_path, 'rb') as job_file:
+                content = tomllib.load(job_file)
+
+        elif extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                print_error("YAML job files require PyYAML:", "python3 -m pip install pyyaml")
+                raise SystemExit(1)
+            with open(job_file_path, 'r') as job_file:
+                content = yaml.safe_load(job_file)
+
+        else:
+            with open(job_file_path, 'r') as job_file:
+                content = json.load(job_file)
+
+    except (OSError, ValueError) as e:
+        print_error("Job file error:", job_file_path, e)
+        raise SystemExit(1)
+
+    # An empty YAML file loads as None
+    if isinstance(content, list):
+        content = {'jobs': content}
+    if not isinstance(content, dict):
+        print_error("Job file error:", f"{job_file_path} must hold a jobs list or a mapping with a jobs list")
+        raise SystemExit(1)
+
+    defaults = content.get('defaults') or {}
+    job_list = content.get('jobs') or []
+    if not isinstance(defaults, dict) or not isinstance(job_list, list):
+        print_error("Job file error:", "defaults must be a mapping and jobs a list")
+        raise SystemExit(1)
+
+    jobs = []
+    job_names = set()
+
+    for index, job in enumerate(job_list):
+        if not isinstance(job, dict):
+            print_error("Job file error:", f"job {index + 1} is not a mapping")
+            raise SystemExit(1)
+
+        job = dict(defaults, **job)
+        job.setdefault('name', f"job-{index + 1}")
+
+        if not job.get('shape'):
+            print_error("Job file error:", f"{job['name']} has no shape")
+            raise SystemExit(1)
+
+        # Cells and outputs are grouped by job name
+        if job['name'] in job_names:
+            print_error("Job file error:", f"duplicate job name {job['name']}")
+            raise SystemExit(1)
+        job_names.add(job['name'])
+
+        jobs.append(job)
+
+    if not jobs:
+        print_error("Job file error:", f"no job found in {job_file_path}")
+        raise SystemExit(1)
+
+    return jobs
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Build a single deduplicated request plan
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def resolve_job_regions(job, subscribed_regions, home_region_name):
+
+    """
+    Returns the region names targeted by a job: its region list, "all_regions" or the home region.
+    """
+
+    target_region = job.get('region') or home_region_name
+
+    if isinstance(target_region, list):
+        return target_region
+    if target_region.lower() == 'all_regions':
+        return [region.region_name for region in subscribed_regions]
+
+    return [name.strip() for name in target_region.split(',') if name.strip()]
+
+def build_job_plan(jobs, config, signer, default_compartment_id):
+
+    """
+    Expands every job into capacity cells and merges identical cells across jobs.
+    Returns the unique cells (cell key -> query_capacity_cell arguments), the cell keys of each job,
+    and the LIMITED rows of the availability domains pruned by the limits pre-check, which are never queried.
+    """
+
+    plan = {}
+    job_cells = {}
+    limited_results = {}
+
+    for job in jobs:
+        job_cells[job['name']] = []
+        compartment_id = job.get('compartment') or default_compartment_id
+        shape_ocpus, shape_memory = resolve_shape_request(job['shape'], job.get('ocpus'), job.get('memory'))
+
+        for region_name in job['regions']:
+            region_config = dict(config, region=region_name)
+            identity_client = get_identity_client(region_config, signer)
+            core_client = get_compute_client(region_config, signer)
+
+            # Topology and shapes come from the shared in-memory caches
+            availability_domains, shapes_in_region = fetch_shapes_and_domains(core_client, identity_client, config['tenancy'], region_name)
+            cell_ocpus, cell_memory, shape_is_flex, shape_info = get_shape_config(job['shape'], shapes_in_region, shape_ocpus, shape_memory)
+            limited_domains = limited_availability_domains(config, signer, compartment_id, region_name, job['shape'], availability_domains)
+
+            for availability_domain in availability_domains:
+                if availability_domain in limited_domains:
+                    cell_key = (region_name, compartment_id, availability_domain, None, job['shape'], cell_ocpus, cell_memory)
+                    limited_results[cell_key] = [abandoned_cell_row(region_name, availability_domain, None, job['shape'], cell_ocpus, cell_memory, None, 'LIMITED')]
+                    job_cells[job['name']].append(cell_key)
+                    continue
+
+                if query_mode_settings['ad_level']:
+                    fault_domains = [None]
+                else:
+                    fault_domains = get_cached_fault_domains(identity_client, config['tenancy'], region_name, availability_domain)
+
+                for fault_domain in fault_domains:
+                    cell_key = (region_name, compartment_id, availability_domain, fault_domain, job['shape'], cell_ocpus, cell_memory)
+                    plan.setdefault(cell_key, (
+                        region_name,
+                        core_client,
+                        availability_domain,
+                        fault_domain,
+                        compartment_id,
+                        shape_info,
+                        job['shape'],
+                        cell_ocpus,
+                        cell_memory,
+                        shape_is_flex,
+                        None,
+                        config['tenancy']
+                    ))
+                    job_cells[job['name']].append(cell_key)
+
+    return plan, job_cells, limited_results
+
+def execute_plan(plan, max_in_flight=64):
+
+    """
+    Queries every unique cell concurrently, with at most max_in_flight cells submitted at a time
+    so large plans do not queue thousands of pending futures. Returns cell key -> rows,
+    failed cells (service, connection or timeout errors, cancelled cells) map to an error message,
+    so one failed cell never aborts the other jobs.
+    """
+
+    results = {}
+
+    def query_cell(cell_key, cell_args):
+        return query_capacity_cell(*cell_args)
+
+    # The cell executor is looked up on each run, it is replaced when pending cells are cancelled
+    for (cell_key, _), future in bounded_map(capacity.cell_executor, query_cell, plan.items(), max_in_flight):
+        try:
+            results[cell_key] = future.result()
+        except oci.exceptions.ServiceError as e:
+            results[cell_key] = e.message
+        except Exception as e:
+            results[cell_key] = str(e) or type(e).__name__
+
+    return results
+
+def expand_fault_domains(plan, results, job_cells, config, signer):
+
+    """
+    In availability domain level mode, adds the fault domain cells of availability domains needing detail
+    to the plan, replacing the availability domain cell in the jobs using them. Returns the new cells only.
+    """
+
+    detail_plan = {}
+
+    for cell_key, rows in list(results.items()):
+        if isinstance(rows, str) or not needs_fault_domain_detail(rows):
+            continue
+
+        region_name, compartment_id, availability_domain, _, shape_name, cell_ocpus, cell_memory = cell_key
+        cell_args = plan[cell_key]
+        identity_client = get_identity_client(dict(config, region=region_name), signer)
+
+        detail_keys = []
+        for fault_domain in get_cached_fault_domains(identity_client, config['tenancy'], region_name, availability_domain):
+            detail_key = (region_name, compartment_id, availability_domain, fault_domain, shape_name, cell_ocpus, cell_memory)
+            detail_plan[detail_key] = cell_args[:3] + (fault_domain,) + cell_args[4:]
+            detail_keys.append(detail_key)
+
+        # Fault domain cells replace the availability domain cell, so capacity is never counted twice
+        for cell_keys in job_cells.values():
+            if cell_key in cell_keys:
+                position = cell_keys.index(cell_key)
+                cell_keys[position:position + 1] = detail_keys
+
+    plan.update(detail_plan)
+    return detail_plan
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Write per-job outputs
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def write_job_output(job, rows, errors):
+
+    """
+    Writes the rows of a job to its output file: JSON (.json), CSV (.csv) or a text report.
+    """
+
+    output_path = path_expander(job.get('output') or f"{job['name']}.txt")
+    extension = os.path.splitext(output_path)[1].lower()
+    drcc = bool(job.get('drcc'))
+
+    with open(output_path, 'w', newline='') as output_file:
+        if extension == '.json':
+            json.dump({'job': job['name'], 'rows': rows, 'errors': errors}, output_file, indent=2, default=str)
+
+        elif extension == '.csv':
+            writer = csv.DictWriter(output_file, fieldnames=['region', 'availability_domain', 'fault_domain', 'shape', 'ocpus', 'memory', 'available_count', 'availability_status'], extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+
+        else:
+            output_file.write(format_report_header(drcc).strip('\n') + '\n\n')
+            for row in rows:
+                output_file.write(format_report_row(row, drcc) + '\n')
+            for error in errors:
+                output_file.write(f"ERROR: {error}\n")
+
+    return output_path
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Run a job file
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_job_file(job_file_path, identity_client, config, signer, default_compartment_id):
+
+    """
+    Runs every job of a job file as one batched execution: shared clients and caches,
+    one request per unique cell across all jobs, then one output per job.
+    """
+
+    jobs = load_job_file(job_file_path)
+
+    # Resolve compartment names and paths once, from the bulk loaded compartment tree
+    compartments = {}
+    for compartment in {default_compartment_id} | {job['compartment'] for job in jobs if job.get('compartment')}:
+        compartments[compartment] = resolve_compartment(identity_client, config['tenancy'], compartment)
+        if not compartments[compartment]:
+            raise SystemExit(1)
+
+    default_compartment_id = compartments[default_compartment_id]
+    for job in jobs:
+        if job.get('compartment'):
+            job['compartment'] = compartments[job['compartment']]
+
+    # Resolve and validate the union of the regions used by the jobs, once
+    subscribed_regions = get_region_subscription_list(identity_client, config['tenancy'], 'all_regions')
+    home_region_name = next(region.region_name for region in subscribed_regions if region.is_home_region)
+    subscribed_names = {region.region_name for region in subscribed_regions}
+
+    for job in jobs:
+        job['regions'] = resolve_job_regions(job, subscribed_regions, home_region_name)
+        unknown_regions = [name for name in job['regions'] if name not in subscribed_names]
+        if unknown_regions:
+            print_error("Job file error:", f"{job['name']}: regions not subscribed: {', '.join(unknown_regions)}")
+            raise SystemExit(1)
+
+    used_regions = [region for region in subscribed_regions if any(region.region_name in job['regions'] for job in jobs)]
+    validated_names = {region.region_name for region in validate_region_connectivity(used_regions, config, signer)}
+    for job in jobs:
+        job['regions'] = [name for name in job['regions'] if name in validated_names]
+
+    # Plan and execute every unique cell once
+    plan, job_cells, limited_results = build_job_plan(jobs, config, signer, default_compartment_id)
+    requested_cells = sum(len(cell_keys) for cell_keys in job_cells.values())
+    results = execute_plan(plan)
+
+    if query_mode_settings['ad_level']:
+        results.update(execute_plan(expand_fault_domains(plan, results, job_cells, config, signer)))
+
+    results.update(limited_results)
+
+    print_info(green, 'Jobs', 'planned', f"{len(jobs)} jobs, {requested_cells} cells, {len(plan)} unique")
+
+    # Write each job output
+    for job in jobs:
+        rows = []
+        errors = []
+        for cell_key in job_cells[job['name']]:
+            if isinstance(results[cell_key], str):
+                # Failed cells also get an ERROR row, so every output format shows them
+                region_name, _, availability_domain, fault_domain, shape_name, cell_ocpus, cell_memory = cell_key
+                rows.append(abandoned_cell_row(region_name, availability_domain, fault_domain, shape_name, cell_ocpus, cell_memory, None, 'ERROR'))
+                errors.append(f"{region_name} {availability_domain} {fault_domain or '-'}: {results[cell_key]}")
+            else:
+                rows += results[cell_key]
+
+        output_path = write_job_output(job, rows, errors)
+        print_info(red if errors else green, 'Job', job['name'], output_path)
@@ -0,0 +1,135 @@
+# coding: utf-8
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.cache import cache_key, read_cache, write_cache
+from modules.clients import get_limits_client
+from modules.stream import page_records
+from modules.deadline import bind_deadline, deadline_call_kwargs
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Service limits and quotas pre-check
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+limits_settings = {'enabled': False, 'ttl': 3600}
+
+def set_limits_check(enabled, ttl=3600):
+
+    """
+    Enables the service limits and quotas pre-check, limit values are cached for ttl seconds.
+    """
+
+    limits_settings['enabled'] = bool(enabled)
+    limits_settings['ttl'] = max(0, ttl or 0)
+
+LIMIT_RESOURCE_SUFFIXES = ('-core-count', '-memory-count', '-count')
+
+def shape_limit_family(shape_name):
+
+    """
+    Returns the compute limit family of a shape, compared without separators:
+    VM.Standard.E5.Flex -> standarde5 (standard-e5-core-count, standard-e5-memory-count),
+    BM.GPU.H100.8 -> gpuh100 (gpu-h100-count), VM.DenseIO.E4.Flex -> denseioe4 (dense-io-e4-core-count).
+    """
+
+    parts = [part for part in shape_name.split('.')[1:] if not part.isdigit() and part != 'Flex']
+    return normalize_limit_name(''.join(parts))
+
+def limit_family(limit_name):
+
+    """
+    Returns the family of a compute limit name, the name without its resource suffix, compared
+    without separators: standard-e2-micro-core-count -> standarde2micro, so it never matches standarde2.
+    Returns None for limits that are not counts of a shape family.
+    """
+
+    for suffix in LIMIT_RESOURCE_SUFFIXES:
+        if limit_name.endswith(suffix):
+            return normalize_limit_name(limit_name[:-len(suffix)])
+    return None
+
+def normalize_limit_name(name):
+    return name.lower().replace('-', '').replace('_', '')
+
+def load_limit_values(limits_client, tenancy_id, region_name):
+
+    """
+    Bulk loads every compute limit value of the tenancy in a region, as [name, scope type, availability domain, value].
+    """
+
+    key = cache_key('values', tenancy_id, region_name)
+    values, _ = read_cache('limits', key, limits_settings['ttl'])
+
+    if values is None:
+        values = [
+            [limit.name, limit.scope_type, limit.availability_domain, limit.value]
+            for limit in page_records(limits_client.list_limit_values, tenancy_id, 'compute')
+        ]
+        write_cache('limits', key, values)
+
+    return values
+
+def limited_availability_domains(config, signer, compartment_id, region_name, shape_name, availability_domains):
+
+    """
+    Returns the availability domains of a region where the shape cannot be launched:
+    a service limit of the exact shape family (e.g. its cores or its memory) is 0, or compartment quotas
+    and current usage leave nothing of it available.
+    Limit values are cached, availability depends on current usage and is read on every call,
+    concurrently and within the deadline of the caller.
+    Shapes without a matching limit, and regions where limits cannot be read, are never pruned.
+    Returns an empty set when the pre-check is disabled.
+    """
+
+    if not limits_settings['enabled']:
+        return set()
+
+    family = shape_limit_family(shape_name)
+    if not family:
+        return set()
+
+    try:
+        limits_client = get_limits_client(dict(config, region=region_name), signer)
+        shape_limits = [
+            limit for limit in load_limit_values(limits_client, config['tenancy'], region_name)
+            if limit_family(limit[0]) == family
+        ]
+
+        limited = set()
+        domain_resources = {}
+        for availability_domain in availability_domains:
+            domain_limits = [limit for limit in shape_limits if limit[1] != 'AD' or limit[2] == availability_domain]
+            if any(limit[3] == 0 for limit in domain_limits):
+                limited.add(availability_domain)
+            elif domain_limits:
+                # Region scoped limits are read once for every availability domain
+                domain_resources[availability_domain] = {
+                    (name, availability_domain if scope_type == 'AD' else None) for name, scope_type, _, _ in domain_limits
+                }
+
+        def resource_available(limit_name, availability_domain):
+            # Accounts for compartment quotas and current usage
+            return limits_client.get_resource_availability(
+                'compute',
+                limit_name,
+                compartment_id,
+                availability_domain=availability_domain,
+                **deadline_call_kwargs()
+            ).data.available
+
+        resources = set().union(*domain_resources.values())
+        available = {}
+        if resources:
+            with ThreadPoolExecutor(max_workers=min(len(resources), 8)) as executor:
+                futures = {executor.submit(bind_deadline(resource_available), *resource): resource for resource in resources}
+                for future in as_completed(futures):
+                    available[futures[future]] = future.result()
+
+        limited.update(
+            availability_domain for availability_domain, domain_resource_keys in domain_resources.items()
+            if any(available[resource] == 0 for resource in domain_resource_keys)
+        )
+
+    except Exception:
+        # Without access to limits (permissions, network, deadline) every availability domain is queried
+        return set()
+
+    return limited
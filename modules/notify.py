@@ -0,0 +1,137 @@
+# coding: utf-8
+
+import os
+import json
+import time
+import uuid
+import tempfile
+import urllib.request
+from modules.utils import yellow, print_error, path_expander
+from modules.cache import cache_key, read_cache, write_cache
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Detect capacity transitions
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class CapacityNotifier:
+
+    """
+    Compares each capacity result with the last confirmed status of its cell
+    (tenancy, region, availability domain, fault domain, shape, oCPUs, memory) and publishes
+    an event for every transition, e.g. OUT_OF_HOST_CAPACITY -> AVAILABLE.
+    A new status is confirmed after being seen in debounce consecutive runs, so flapping cells stay quiet.
+    Confirmed statuses are kept in the local cache, so transitions are detected across runs.
+    """
+
+    def __init__(self, targets, scope, debounce=1):
+        self.targets = [target.strip() for target in targets.split(',') if target.strip()]
+        self.debounce = max(1, debounce)
+        self.state_key = cache_key(*scope)
+        self.state, _ = read_cache('notify', self.state_key)
+        self.state = self.state or {}
+
+    def process(self, rows):
+
+        """
+        Updates the cell states with the rows of a run, then publishes and returns the transition events.
+        Cells abandoned on a deadline or skipped by the limits pre-check (LIMITED) are not observations
+        and are ignored, as are rows served from the capacity cache: a cached status was already counted when observed.
+        """
+
+        events = []
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+        for row in rows:
+            status = row['availability_status']
+            if status in ('TIMED_OUT', 'CANCELLED', 'LIMITED') or row.get('cache_age') is not None:
+                continue
+
+            cell = '|'.join(str(row[column] or '') for column in ('tenancy', 'region', 'availability_domain', 'fault_domain', 'shape', 'ocpus', 'memory'))
+            entry = self.state.get(cell)
+
+            if entry is None:
+                self.state[cell] = {'status': status, 'candidate': None, 'count': 0, 'since': now}
+                continue
+
+            if status == entry['status']:
+                entry['candidate'], entry['count'] = None, 0
+                continue
+
+            if status == entry['candidate']:
+                entry['count'] += 1
+            else:
+                entry['candidate'], entry['count'] = status, 1
+
+            if entry['count'] >= self.debounce:
+                events.append({
+                    'type': 'capacity_transition',
+                    'time': now,
+                    'tenancy': row['tenancy'],
+                    'region': row['region'],
+                    'availability_domain': row['availability_domain'],
+                    'fault_domain': row['fault_domain'],
+                    'shape': row['shape'],
+                    'ocpus': row['ocpus'],
+                    'memory': row['memory'],
+                    'previous_status': entry['status'],
+                    'status': status,
+                    'previous_since': entry['since']
+                })
+                self.state[cell] = {'status': status, 'candidate': None, 'count': 0, 'since': now}
+
+        write_cache('notify', self.state_key, self.state)
+
+        if events:
+            self.publish(events)
+
+        return events
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # Publish events
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def publish(self, events):
+
+        """
+        Sends the events of a run to every target: 'stdout', an http(s) webhook URL
+        receiving one JSON POST per run, or 'file:/path/to/dir', a local queue holding one JSON file per event.
+        A failing target is reported and never stops the run.
+        """
+
+        for target in self.targets:
+            try:
+                if target == 'stdout':
+                    for event in events:
+                        print(yellow(json.dumps(event)))
+
+                elif target.startswith(('http://', 'https://')):
+                    publish_webhook(target, events)
+
+                elif target.startswith('file:'):
+                    publish_file_queue(target[len('file:'):], events)
+
+                else:
+                    print_error("Unknown notification target:", target, "use stdout, an http(s) URL or file:/path", level='INFO')
+
+            except (OSError, ValueError) as e:
+                print_error("Notification error:", target, e, level='INFO')
+
+def publish_webhook(url, events, timeout=10):
+    body = json.dumps({'events': events}, default=str).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+def publish_file_queue(queue_dir, events):
+
+    """
+    Writes one file per event, renamed into place once complete so consumers never read a partial event.
+    File names sort in publication order.
+    """
+
+    queue_dir = path_expander(queue_dir)
+    os.makedirs(queue_dir, exist_ok=True)
+
+    for index, event in enumerate(events):
+        fd, tmp_path = tempfile.mkstemp(dir=queue_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as event_file:
+            json.dump(event, event_file, default=str)
+        os.replace(tmp_path, os.path.join(queue_dir, f"{time.time_ns()}-{index:04d}-{uuid.uuid4().hex[:8]}.json"))
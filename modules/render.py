@@ -0,0 +1,126 @@
+# coding: utf-8
+
+import sys
+import time
+import threading
+from modules.utils import yellow
+from modules.trace import trace_span
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Live report table
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class LiveTable:
+
+    """
+    Buffers report rows of concurrent regions and renders them in a stable order.
+    Rows are grouped by (tenancy, region): a group is written, sorted by availability domain
+    and fault domain, once it and every group before it are complete, in a single write.
+    On a terminal, a progress line (cells done / in flight / failed, ETA) is updated in place
+    below the rows. When stdout is not a terminal, rows are written as plain buffered blocks.
+    """
+
+    def __init__(self, format_row, groups, stream=None, refresh_interval=0.1):
+        self.format_row = format_row
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty()
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+
+        self.pending_groups = list(groups)
+        self.rows = {group: [] for group in self.pending_groups}
+        self.completed_groups = set()
+
+        self.planned = 0
+        self.done = 0
+        self.failed = 0
+        self.start_time = time.time()
+        self.last_refresh = 0
+
+    def cells_started(self, count):
+        with self.lock:
+            self.planned += count
+            self.refresh()
+
+    def cell_done(self, group, rows):
+        with self.lock:
+            self.done += 1
+            self.rows.setdefault(group, []).extend(rows)
+            self.refresh()
+
+    def add_rows(self, group, rows):
+
+        """
+        Adds rows of cells already counted as done, e.g. held back until their detail was known.
+        """
+
+        with self.lock:
+            self.rows.setdefault(group, []).extend(rows)
+
+    def cell_failed(self, group):
+        with self.lock:
+            self.failed += 1
+            self.refresh()
+
+    def group_done(self, group):
+
+        """
+        Marks a (tenancy, region) group as complete and writes every group now ready.
+        """
+
+        with self.lock:
+            self.completed_groups.add(group)
+            self.flush(force=False)
+
+    def close(self):
+
+        """
+        Writes the remaining groups, including incomplete ones, and removes the progress line.
+        """
+
+        with self.lock:
+            self.flush(force=True)
+            if self.live:
+                self.stream.write('\r\033[K')
+                self.stream.flush()
+
+    def flush(self, force):
+        lines = []
+        while self.pending_groups and (force or self.pending_groups[0] in self.completed_groups):
+            group = self.pending_groups.pop(0)
+            group_rows = sorted(self.rows.pop(group, []), key=lambda row: (row['availability_domain'], row['fault_domain'] or ''))
+            lines += [self.format_row(row) for row in group_rows]
+
+        if lines:
+            with trace_span('print rows', rows=len(lines)):
+                self.write('\n'.join(lines) + '\n')
+        else:
+            self.refresh()
+
+    def write(self, text):
+        if self.live:
+            # Rows go above the progress line, which is then redrawn
+            self.stream.write('\r\033[K' + text)
+            self.last_refresh = 0
+            self.refresh()
+        else:
+            self.stream.write(text)
+            self.stream.flush()
+
+    def refresh(self):
+        if not self.live:
+            return
+
+        now = time.time()
+        if now - self.last_refresh < self.refresh_interval:
+            return
+        self.last_refresh = now
+
+        finished = self.done + self.failed
+        in_flight = max(0, self.planned - finished)
+        if finished:
+            eta = f"{(now - self.start_time) / finished * in_flight:.0f}s"
+        else:
+            eta = '-'
+
+        self.stream.write(yellow(f"\r => cells done: {self.done}  in flight: {in_flight}  failed: {self.failed}  ETA: {eta}") + '\033[K')
+        self.stream.flush()
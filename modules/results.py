@@ -0,0 +1,268 @@
+# coding: utf-8
+
+import os
+import math
+from array import array
+from collections import Counter
+from modules.utils import green, red, print_info, print_error, path_expander
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Columnar result container
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+STRING_COLUMNS = ('tenancy', 'compartment', 'region', 'availability_domain', 'fault_domain', 'shape', 'availability_status')
+FLOAT_COLUMNS = ('ocpus', 'memory', 'cache_age')
+INTEGER_COLUMNS = ('available_count',)
+
+class ResultTable:
+
+    """
+    Stores capacity result rows as columns instead of one dict per row.
+    String columns are dictionary-encoded (each distinct value is stored once, rows hold
+    an integer code), numeric columns are compact typed arrays. Missing numbers are NaN
+    for floats and -1 for counts.
+    Iterating the table yields row dicts, so it can replace a list of rows.
+    """
+
+    def __init__(self, rows=None):
+        self.dictionaries = {column: [] for column in STRING_COLUMNS}
+        self.lookups = {column: {} for column in STRING_COLUMNS}
+        self.columns = {column: array('I') for column in STRING_COLUMNS}
+        self.columns.update({column: array('d') for column in FLOAT_COLUMNS})
+        self.columns.update({column: array('q') for column in INTEGER_COLUMNS})
+
+        if rows:
+            self.extend(rows)
+
+    def __len__(self):
+        return len(self.columns['region'])
+
+    def __iter__(self):
+        return self.rows()
+
+    def __iadd__(self, rows):
+        self.extend(rows)
+        return self
+
+    def encode(self, column, value):
+        lookup = self.lookups[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.dictionaries[column])
+            self.dictionaries[column].append(value)
+        return code
+
+    def append(self, row):
+        for column in STRING_COLUMNS:
+            self.columns[column].append(self.encode(column, row.get(column)))
+        for column in FLOAT_COLUMNS:
+            value = row.get(column)
+            self.columns[column].append(float(value) if isinstance(value, (int, float)) else math.nan)
+        for column in INTEGER_COLUMNS:
+            value = row.get(column)
+            self.columns[column].append(int(value) if isinstance(value, (int, float)) else -1)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def column(self, name):
+
+        """
+        Returns the decoded values of a column as a list.
+        """
+
+        if name in STRING_COLUMNS:
+            dictionary = self.dictionaries[name]
+            return [dictionary[code] for code in self.columns[name]]
+        return list(self.columns[name])
+
+    def rows(self):
+
+        """
+        Yields every row as a dict, with the same values as the original report rows.
+        """
+
+        def decode_number(value):
+            if math.isnan(value):
+                return '-'
+            return int(value) if value.is_integer() else value
+
+        for index in range(len(self)):
+            row = {column: self.dictionaries[column][self.columns[column][index]] for column in STRING_COLUMNS}
+            row['ocpus'] = decode_number(self.columns['ocpus'][index])
+            row['memory'] = decode_number(self.columns['memory'][index])
+            row['available_count'] = self.columns['available_count'][index] if self.columns['available_count'][index] >= 0 else None
+            row['cache_age'] = None if math.isnan(self.columns['cache_age'][index]) else self.columns['cache_age'][index]
+            yield row
+
+    def to_columns(self):
+
+        """
+        Returns the table as a JSON serializable dict of dictionaries and column arrays.
+        """
+
+        return {
+            'dictionaries': self.dictionaries,
+            'columns': {column: values.tolist() for column, values in self.columns.items()}
+        }
+
+    @classmethod
+    def from_columns(cls, content):
+
+        """
+        Rebuilds a table written by to_columns.
+        """
+
+        table = cls()
+        for column in STRING_COLUMNS:
+            table.dictionaries[column] = content['dictionaries'][column]
+            table.lookups[column] = {value: code for code, value in enumerate(table.dictionaries[column])}
+        for column, values in table.columns.items():
+            values.extend(content['columns'][column])
+        return table
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # Aggregations
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def availability_by(self, *columns):
+
+        """
+        Counts AVAILABLE cells and total cells per combination of string columns,
+        e.g. availability_by('shape', 'region'). Returns {(values...): (available, total)}.
+        Vectorized with NumPy when installed.
+        """
+
+        if not len(self):
+            return {}
+
+        available_code = self.lookups['availability_status'].get('AVAILABLE', -1)
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            # Combine the codes of every grouping column into a single group index
+            group_index = np.zeros(len(self), dtype=np.int64)
+            for column in columns:
+                group_index = group_index * len(self.dictionaries[column]) + np.frombuffer(self.columns[column], dtype=np.uint32)
+
+            groups, inverse = np.unique(group_index, return_inverse=True)
+            totals = np.bincount(inverse)
+            available = np.bincount(inverse, weights=np.frombuffer(self.columns['availability_status'], dtype=np.uint32) == available_code)
+
+            result = {}
+            for group, group_available, group_total in zip(groups.tolist(), available.tolist(), totals.tolist()):
+                key = []
+                for column in reversed(columns):
+                    group, code = divmod(group, len(self.dictionaries[column]))
+                    key.append(self.dictionaries[column][code])
+                result[tuple(reversed(key))] = (int(group_available), group_total)
+            return result
+
+        totals = Counter()
+        available = Counter()
+        for index in range(len(self)):
+            codes = tuple(self.columns[column][index] for column in columns)
+            totals[codes] += 1
+            if self.columns['availability_status'][index] == available_code:
+                available[codes] += 1
+
+        return {
+            tuple(self.dictionaries[column][code] for column, code in zip(columns, codes)): (available[codes], total)
+            for codes, total in totals.items()
+        }
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # Exports
+    # - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def to_npz(self, path):
+
+        """
+        Writes the table to a compressed NumPy .npz file: one array of codes and one array
+        of values per string column, one array per numeric column. Requires NumPy.
+        """
+
+        try:
+            import numpy as np
+        except ImportError:
+            print_error(".npz exports require NumPy:", "python3 -m pip install numpy")
+            raise SystemExit(1)
+
+        arrays = {}
+        for column in STRING_COLUMNS:
+            arrays[column] = np.frombuffer(self.columns[column], dtype=np.uint32)
+            arrays[f"{column}_values"] = np.array(['' if value is None else str(value) for value in self.dictionaries[column]])
+        for column in FLOAT_COLUMNS:
+            arrays[column] = np.frombuffer(self.columns[column], dtype=np.float64)
+        for column in INTEGER_COLUMNS:
+            arrays[column] = np.frombuffer(self.columns[column], dtype=np.int64)
+
+        np.savez_compressed(path, **arrays)
+
+    def to_arrow(self):
+
+        """
+        Returns the table as a pyarrow Table with dictionary-encoded string columns. Requires pyarrow.
+        """
+
+        try:
+            import pyarrow as pa
+        except ImportError:
+            print_error("Parquet and Arrow exports require pyarrow:", "python3 -m pip install pyarrow")
+            raise SystemExit(1)
+
+        arrays = {}
+        for column in STRING_COLUMNS:
+            # Missing values are null indices, not a null dictionary entry
+            none_code = self.lookups[column].get(None)
+            arrays[column] = pa.DictionaryArray.from_arrays(
+                pa.array([None if code == none_code else code for code in self.columns[column]], type=pa.uint32()),
+                pa.array(['' if value is None else value for value in self.dictionaries[column]], type=pa.string())
+            )
+        for column in FLOAT_COLUMNS:
+            arrays[column] = pa.array(self.columns[column].tolist(), type=pa.float64(), from_pandas=True)
+        for column in INTEGER_COLUMNS:
+            arrays[column] = pa.array([value if value >= 0 else None for value in self.columns[column]], type=pa.int64())
+
+        return pa.table(arrays)
+
+    def export(self, path):
+
+        """
+        Writes the table to .npz (NumPy), .parquet or .arrow (pyarrow) depending on the file extension.
+        """
+
+        extension = os.path.splitext(path)[1].lower()
+
+        if extension == '.npz':
+            self.to_npz(path)
+        elif extension == '.parquet':
+            table = self.to_arrow()
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        elif extension in ('.arrow', '.feather'):
+            table = self.to_arrow()
+            import pyarrow.feather as feather
+            feather.write_feather(table, path)
+        else:
+            print_error("Unsupported export format:", path, "use .npz, .parquet or .arrow")
+            raise SystemExit(1)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Export sweep results
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def export_results(rows, path):
+
+    """
+    Exports sweep rows to a columnar file, then prints the availability per shape and region.
+    """
+
+    table = rows if isinstance(rows, ResultTable) else ResultTable(rows)
+    table.export(path_expander(path))
+
+    print()
+    for (shape, region), (available, total) in sorted(table.availability_by('shape', 'region').items()):
+        print_info(green if available else red, shape, region, f"{available}/{total} available")
+    print_info(green, 'Export', 'written', f"{len(table)} rows to {path}")
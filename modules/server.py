@@ -0,0 +1,190 @@
+# coding: utf-8
+
+import os
+import json
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+import oci
+from modules.utils import green, yellow, print_info, print_error
+from modules.coalesce import SingleFlight
+from modules.shapes import get_shape_index
+from modules.identity import sort_regions_by_latency
+from modules.capacity import query_region_capacity, resolve_shape_request, shape_request_error
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# HTTP request handler
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class CapacityRequestHandler(BaseHTTPRequestHandler):
+
+    """
+    Answers capacity queries:
+        GET /health
+        GET /capacity?shape=VM.Standard.E5.Flex&region=eu-paris-1,eu-frankfurt-1&ocpus=2&memory=16
+    Identical concurrent queries are coalesced into a single sweep.
+    """
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            self.send_json(200, {'status': 'ok', 'regions': list(self.server.regions)})
+        elif url.path == '/capacity':
+            self.handle_capacity(params)
+        else:
+            self.send_json(404, {'error': f"unknown path {url.path}"})
+
+    def handle_capacity(self, params):
+        shape = params.get('shape')
+        if not shape:
+            self.send_json(400, {'error': 'missing shape parameter'})
+            return
+
+        requested_regions = params.get('region', 'all_regions')
+        if requested_regions == 'all_regions':
+            region_names = sorted(self.server.regions)
+        else:
+            region_names = sorted({region.strip() for region in requested_regions.split(',') if region.strip()})
+            unknown_regions = [region for region in region_names if region not in self.server.regions]
+            if unknown_regions:
+                self.send_json(400, {'error': f"regions not served: {', '.join(unknown_regions)}"})
+                return
+
+        try:
+            ocpus = int(params['ocpus']) if params.get('ocpus') else None
+            memory = int(params['memory']) if params.get('memory') else None
+        except ValueError:
+            self.send_json(400, {'error': 'invalid ocpus or memory parameter: integers expected'})
+            return
+
+        if (ocpus is not None and ocpus <= 0) or (memory is not None and memory <= 0):
+            self.send_json(400, {'error': 'invalid ocpus or memory parameter: positive values expected'})
+            return
+
+        # Checked here, resolve_shape_request reports errors on the server console
+        error = shape_request_error(shape, ocpus)
+        if error:
+            self.send_json(400, {'error': error.replace('-ocpus', 'ocpus')})
+            return
+
+        compartment_id = params.get('compartment', self.server.compartment_id)
+        if not compartment_id.startswith(('ocid1.compartment.', 'ocid1.tenancy.')):
+            self.send_json(400, {'error': f"invalid compartment parameter: {compartment_id}"})
+            return
+
+        try:
+            shape_ocpus, shape_memory = resolve_shape_request(shape, ocpus, memory)
+            key = (tuple(region_names), shape, shape_ocpus, shape_memory, compartment_id)
+            rows = self.server.single_flight.do(key, self.server.run_query, region_names, shape, shape_ocpus, shape_memory, compartment_id)
+            self.send_json(200, {'rows': rows})
+        except oci.exceptions.ServiceError as e:
+            self.send_json(e.status or 502, {'error': e.message, 'code': e.code})
+        except SystemExit:
+            self.send_json(502, {'error': 'unable to load region topology or shapes'})
+        except Exception as e:
+            # Connection errors, unknown shapes... every request gets an answer
+            self.send_json(500, {'error': str(e) or type(e).__name__, 'code': type(e).__name__})
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Capacity server
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class CapacityServerMixin:
+
+    """
+    Holds the authenticated session, the served regions and the coalescing layer.
+    """
+
+    daemon_threads = True
+
+    def setup_capacity(self, config, signer, regions, compartment_id, max_workers):
+        self.config = config
+        self.signer = signer
+        self.regions = {region.region_name: region for region in regions}
+        self.compartment_id = compartment_id
+        self.single_flight = SingleFlight()
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def run_query(self, region_names, shape, shape_ocpus, shape_memory, compartment_id):
+        # Regions without the shape are not queried, the shape index is refreshed after -shapes-ttl
+        shape_index = get_shape_index(self.config, self.signer, self.regions.values(), self.max_workers)
+        region_names = [region_name for region_name in region_names if shape_index.offers(shape, region_name)]
+
+        # Start the slowest regions first
+        regions = sort_regions_by_latency(self.config['tenancy'], [self.regions[region_name] for region_name in region_names])
+
+        futures = [
+            self.executor.submit(
+                query_region_capacity,
+                region.region_name,
+                self.config,
+                self.signer,
+                compartment_id,
+                shape,
+                shape_ocpus,
+                shape_memory
+            )
+            for region in regions
+        ]
+
+        rows = []
+        for future in futures:
+            rows += future.result()
+
+        return rows
+
+class CapacityHTTPServer(CapacityServerMixin, ThreadingHTTPServer):
+    pass
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class CapacityUnixServer(CapacityServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        pass
+
+def serve_capacity(address, config, signer, regions, compartment_id, max_workers=10):
+
+    """
+    Starts the capacity server on "host:port" or "unix:/path/to/socket" and serves until interrupted.
+    """
+
+    if address.startswith('unix:'):
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            print_error("Unix sockets are not supported on this platform:", address, "use host:port")
+            raise SystemExit(1)
+        socket_path = address[len('unix:'):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = CapacityUnixServer(socket_path, CapacityRequestHandler)
+    else:
+        host, _, port = address.rpartition(':')
+        try:
+            server = CapacityHTTPServer((host or '127.0.0.1', int(port)), CapacityRequestHandler)
+        except ValueError:
+            print_error("Invalid server address:", address, "use host:port or unix:/path/to/socket")
+            raise SystemExit(1)
+
+    server.setup_capacity(config, signer, regions, compartment_id, max_workers)
+
+    print_info(green, 'Server', 'listening', address)
+    print(yellow(f"\nQuery example: GET /capacity?shape=VM.Standard.E5.Flex&ocpus=2&memory=16\n"))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown(wait=False)
@@ -0,0 +1,143 @@
+# coding: utf-8
+
+import difflib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.utils import yellow, red, print_info, print_error
+from modules.cache import cache_key, read_cache, write_cache
+from modules.clients import get_compute_client
+from modules.topology import get_or_reload, get_cached_shapes, forget_cached_shapes
+from modules.trace import traced
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Cross-region shape index
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+shape_index_settings = {'ttl': 86400}
+
+def set_shape_index_ttl(ttl):
+
+    """
+    Sets how long (in seconds) the shapes listed in a region are reused, from memory or from the local cache.
+    0 lists the shapes of every region on each run.
+    """
+
+    shape_index_settings['ttl'] = max(0, ttl or 0)
+
+class ShapeIndex:
+
+    """
+    Maps every shape name to the regions offering it.
+    Regions whose shapes could not be listed are kept apart: they may offer any shape.
+    """
+
+    def __init__(self):
+        self.regions = {}
+        self.unknown_regions = set()
+
+    def add(self, region_name, shape_names):
+        for shape_name in shape_names:
+            self.regions.setdefault(shape_name, set()).add(region_name)
+
+    def shape_names(self):
+        return sorted(self.regions)
+
+    def offers(self, shape_name, region_name):
+        return region_name in self.unknown_regions or region_name in self.regions.get(shape_name, ())
+
+def list_region_shape_names(config, signer, region_name):
+
+    """
+    Returns the shape names of a region, listed again even if already in memory.
+    The shape models stay in the in-memory topology cache, so the sweep of the region does not list them again.
+    """
+
+    forget_cached_shapes(config['tenancy'], region_name)
+    core_client = get_compute_client(dict(config, region=region_name), signer)
+    return sorted({shape.shape for shape in get_cached_shapes(core_client, config['tenancy'], region_name)})
+
+@traced
+def load_shape_index(config, signer, region_names, max_workers=10):
+
+    """
+    Builds the shape index of the given regions. Shapes of each region are read from the local cache
+    when recent enough, the remaining regions are listed concurrently and cached one by one,
+    so a new subscription or an expired region only costs its own listing.
+    """
+
+    ttl = shape_index_settings['ttl']
+    shape_index = ShapeIndex()
+    regions_to_list = []
+
+    for region_name in region_names:
+        shape_names, _ = read_cache('shapes', cache_key(config['tenancy'], region_name), ttl) if ttl else (None, None)
+        if shape_names is None:
+            regions_to_list.append(region_name)
+        else:
+            shape_index.add(region_name, shape_names)
+
+    if not regions_to_list:
+        return shape_index
+
+    print(yellow(f"\r => Listing shapes in {len(regions_to_list)} regions..."), end=' ' * 50 + '\r', flush=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions_to_list)))) as executor:
+        futures = {
+            executor.submit(list_region_shape_names, config, signer, region_name): region_name
+            for region_name in regions_to_list
+        }
+        for future in as_completed(futures):
+            region_name = futures[future]
+            try:
+                shape_names = future.result()
+            except Exception as e:
+                # The region is still swept, its shapes are checked there
+                shape_index.unknown_regions.add(region_name)
+                print_error("Shapes listing error:", region_name, e, level='INFO')
+                continue
+
+            write_cache('shapes', cache_key(config['tenancy'], region_name), shape_names)
+            shape_index.add(region_name, shape_names)
+
+    return shape_index
+
+def get_shape_index(config, signer, regions, max_workers=10):
+
+    """
+    Returns the shape index of the regions, kept in memory as long as the local cache keeps the listings,
+    so long running modes (-watch, -serve) see the shapes added to a region.
+    """
+
+    region_names = tuple(sorted(region.region_name for region in regions))
+    return get_or_reload(
+        ('shape_index', config['tenancy'], region_names),
+        shape_index_settings['ttl'],
+        load_shape_index,
+        config,
+        signer,
+        region_names,
+        max_workers
+    )
+
+def select_shape_regions(shape_index, regions, shape_name):
+
+    """
+    Returns the regions offering the shape, and reports the regions skipped.
+    An empty list means the shape name is not offered by any region: the error is printed,
+    with the closest shape names as suggestions.
+    """
+
+    selected = [region for region in regions if shape_index.offers(shape_name, region.region_name)]
+
+    if not selected:
+        print_error("Shape not offered in the analyzed regions:", shape_name, level='INFO')
+        suggestions = difflib.get_close_matches(shape_name, shape_index.shape_names(), n=3, cutoff=0.6)
+        if suggestions:
+            print_info(yellow, 'Shape', 'did you mean', ', '.join(suggestions))
+        return selected
+
+    skipped = sorted(region.region_name for region in regions if region not in selected)
+    if skipped:
+        print_info(yellow, 'Regions', 'skipped', f"{len(skipped)} without {shape_name}")
+        for region_name in skipped:
+            print_info(red, 'Region', 'no shape', region_name)
+
+    return selected
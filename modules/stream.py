@@ -0,0 +1,50 @@
+# coding: utf-8
+
+import oci
+from concurrent.futures import wait, FIRST_COMPLETED
+from modules.deadline import deadline_call_kwargs
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Stream paginated API results
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def page_records(list_function, *args, **kwargs):
+
+    """
+    Yields the records of every page of an OCI list call, one page in memory at a time,
+    instead of materializing the complete result first.
+    Retries are bounded by the deadline of the calling thread, if any.
+    """
+
+    kwargs = dict(deadline_call_kwargs(), **kwargs)
+    return oci.pagination.list_call_get_all_results_generator(list_function, 'record', *args, **kwargs)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Bounded concurrent map
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def bounded_map(executor, function, items, max_in_flight):
+
+    """
+    Runs function(*item) on the executor for every item of an iterable, with at most max_in_flight
+    items submitted and not yet consumed. Items are only pulled from the iterable as earlier ones
+    complete, so a generator of work items is never materialized, and a slow consumer holds back
+    submissions (backpressure). Yields (item, future) pairs in completion order.
+    """
+
+    items = iter(items)
+    in_flight = {}
+
+    def submit_next():
+        for item in items:
+            in_flight[executor.submit(function, *item)] = item
+            return True
+        return False
+
+    while len(in_flight) < max_in_flight and submit_next():
+        pass
+
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = in_flight.pop(future)
+            submit_next()
+            yield item, future
@@ -0,0 +1,498 @@
+# coding: utf-8
+
+import oci
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, TimeoutError as FuturesTimeoutError
+from modules.utils import green, yellow, red, print_error, print_info
+from modules.cache import cache_key, read_cache, write_cache
+from modules.exceptions import RestartFlowException
+from modules.clients import create_client
+from modules.identity import get_region_subscription_list, validate_region_connectivity, get_region_latencies, sort_regions_by_latency
+from modules.capacity import process_region, print_report_header, format_report_row, resolve_shape_request, set_report_budget, query_region_capacity, abandoned_cell_row
+from modules.deadline import new_sweep_deadline
+from modules.render import LiveTable
+from modules.results import ResultTable
+from modules.history import record_history
+from modules.shapes import get_shape_index
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Resolve the regions to scan for each tenancy
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def prepare_tenancy_regions(session, target_region):
+
+    """
+    Loads and validates the regions to analyze for an authenticated tenancy.
+    Returns the validated regions, or an empty list if the tenancy cannot be scanned.
+    """
+
+    config, signer, tenancy, auth_name, details = session
+
+    try:
+        identity_client = create_client(oci.identity.IdentityClient, config, signer)
+        regions = get_region_subscription_list(identity_client, config['tenancy'], target_region)
+        return validate_region_connectivity(regions, config, signer)
+
+    except SystemExit:
+        print_info(red, 'Tenancy', 'ignored', tenancy.name)
+        return []
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Wait for regions within the sweep deadline
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def wait_for_regions(futures, deadline, on_done, grace=2):
+
+    """
+    Calls on_done(future) for each region as it completes, until every region is done,
+    on_done returns True, the sweep deadline expires, or Ctrl-C cancels the deadline.
+    Regions not started are then cancelled, and running ones get a short grace period
+    to return their partial rows, their own waits being bounded by the same deadline.
+    Returns the futures of the regions that returned nothing.
+    """
+
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=deadline.remaining()):
+            pending.discard(future)
+            if on_done(future):
+                break
+    except FuturesTimeoutError:
+        pass
+    except KeyboardInterrupt:
+        deadline.cancel()
+
+    if pending:
+        for future in pending:
+            future.cancel()
+
+        # After an early stop, running regions may finish their current availability domain within the deadline,
+        # after expiry or Ctrl-C they only need a moment to return their partial rows
+        done, _ = wait(pending, timeout=grace if deadline.expired() else deadline.remaining())
+        for future in done:
+            if not future.cancelled():
+                on_done(future)
+
+    return [future for future in futures if future.cancelled() or not future.done()]
+
+def report_abandoned_regions(abandoned, deadline, renderer, user_shape_name, user_shape_ocpus, user_shape_memory):
+
+    """
+    Returns one TIMED_OUT or CANCELLED row per abandoned (tenancy, region), also handed to the renderer.
+    """
+
+    rows = []
+    for tenancy_name, region_name in abandoned:
+        region_rows = [abandoned_cell_row(region_name, '-', None, user_shape_name, user_shape_ocpus, user_shape_memory, tenancy_name, deadline.status)]
+        renderer.cells_started(1)
+        renderer.cell_done((tenancy_name, region_name), region_rows)
+        renderer.group_done((tenancy_name, region_name))
+        rows += region_rows
+
+    return rows
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Scan several tenancies in parallel
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_multi_tenancy_scan(sessions, target_region, user_shape_name, user_shape_ocpus, user_shape_memory, drcc, max_workers=10, deadline=None):
+
+    """
+    Runs the capacity sweep of every authenticated tenancy concurrently.
+    All regions of all tenancies share the same pool and the same capacity report budget,
+    results are printed as a single stream labeled with the tenancy name.
+    Each tenancy is analyzed at its root compartment.
+    """
+
+    deadline = deadline or new_sweep_deadline()
+    set_report_budget(max_workers)
+    shape_ocpus, shape_memory = resolve_shape_request(user_shape_name, user_shape_ocpus, user_shape_memory)
+
+    # Load and validate regions of each tenancy concurrently
+    targets = []
+    with ThreadPoolExecutor(max_workers=max(1, min(len(sessions), max_workers))) as executor:
+        futures = {executor.submit(prepare_tenancy_regions, session, target_region): session for session in sessions}
+
+        for future in as_completed(futures):
+            session = futures[future]
+            for region in future.result():
+                targets.append((session, region))
+
+    # Start the slowest regions first
+    def region_latency(target):
+        session, region = target
+        tenancy_id = session[0]['tenancy']
+        return get_region_latencies(tenancy_id, [region]).get(region.region_name, float('inf'))
+
+    targets.sort(key=region_latency, reverse=True)
+
+    if not targets:
+        print_error("No region available in any tenancy")
+        raise SystemExit(1)
+
+    print(green(f"{'*'*94:94}\n"))
+    print_report_header(drcc, tenancy=True)
+
+    rows = ResultTable()
+    failures = []
+
+    # Rows are rendered by tenancy then region, whatever the completion order
+    renderer = LiveTable(
+        lambda row: format_report_row(row, drcc),
+        sorted((session[2].name, region.region_name) for session, region in targets)
+    )
+
+    def collect_rows(future):
+        try:
+            rows.extend(future.result())
+        except (SystemExit, RestartFlowException):
+            failures.append(futures[future])
+        renderer.group_done(futures[future])
+
+    # Process every (tenancy, region) pair through the shared pool
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {}
+        for session, region in targets:
+            config, signer, tenancy, auth_name, details = session
+            future = executor.submit(
+                process_region,
+                region,
+                config,
+                signer,
+                config['tenancy'],
+                user_shape_name,
+                shape_ocpus,
+                shape_memory,
+                renderer,
+                tenancy.name,
+                deadline=deadline
+            )
+            futures[future] = (tenancy.name, region.region_name)
+
+        abandoned = wait_for_regions(futures, deadline, collect_rows)
+        rows += report_abandoned_regions([futures[future] for future in abandoned], deadline, renderer, user_shape_name, shape_ocpus, shape_memory)
+
+    finally:
+        # Stuck requests end with their own timeout, bounded by the deadlines
+        executor.shutdown(wait=False, cancel_futures=True)
+        renderer.close()
+
+    for tenancy_name, region_name in failures:
+        print_info(red, tenancy_name, 'failed', region_name)
+
+    return rows
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Scan several regions in parallel
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_region_sweep(regions, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, drcc, max_workers=10, deadline=None):
+
+    """
+    Processes regions concurrently, starting with the slowest ones measured during 
+    connectivity checks, so the total time is bounded by the slowest region.
+    When the sweep deadline expires or Ctrl-C is pressed, the partial results are returned,
+    with the abandoned cells and regions marked TIMED_OUT or CANCELLED.
+    """
+
+    deadline = deadline or new_sweep_deadline()
+    rows = ResultTable()
+
+    # Rows are rendered in region order, whatever the completion order
+    renderer = LiveTable(
+        lambda row: format_report_row(row, drcc),
+        sorted((None, region.region_name) for region in regions)
+    )
+
+    def collect_rows(future):
+        rows.extend(future.result())
+        renderer.group_done(futures[future])
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                process_region,
+                region,
+                config,
+                signer,
+                compartment_id,
+                user_shape_name,
+                user_shape_ocpus,
+                user_shape_memory,
+                renderer,
+                deadline=deadline
+            ): (None, region.region_name)
+            for region in sort_regions_by_latency(config['tenancy'], regions)
+        }
+
+        abandoned = wait_for_regions(futures, deadline, collect_rows)
+        rows += report_abandoned_regions([futures[future] for future in abandoned], deadline, renderer, user_shape_name, user_shape_ocpus, user_shape_memory)
+
+    finally:
+        # Stuck requests end with their own timeout, bounded by the deadlines
+        executor.shutdown(wait=False, cancel_futures=True)
+        renderer.close()
+
+    # Full sweeps sample every region, first-match scans mostly the top ranked ones
+    update_region_stats(config['tenancy'], user_shape_name, rows)
+
+    return rows
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Rank regions using past results
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def rank_regions(regions, tenancy_id, user_shape_name):
+
+    """
+    Orders regions by the share of AVAILABLE cells seen for this shape in previous runs.
+    Regions never scanned keep their original relative order, after the ranked ones.
+    """
+
+    stats, _ = read_cache('region_stats', cache_key(tenancy_id, user_shape_name))
+    stats = stats or {}
+
+    def availability_ratio(region):
+        region_stats = stats.get(region.region_name)
+        if not region_stats or not region_stats['total']:
+            return -1
+        return region_stats['available'] / region_stats['total']
+
+    return sorted(regions, key=availability_ratio, reverse=True)
+
+def update_region_stats(tenancy_id, user_shape_name, rows):
+
+    """
+    Accumulates per region availability counts used to rank regions in later runs,
+    from full sweeps and first-match scans. Rows served from the capacity cache were already counted.
+    """
+
+    key = cache_key(tenancy_id, user_shape_name)
+    stats, _ = read_cache('region_stats', key)
+    stats = stats or {}
+
+    for row in rows:
+        if row['availability_status'] in ('TIMED_OUT', 'CANCELLED') or row.get('cache_age') is not None:
+            continue
+        region_stats = stats.setdefault(row['region'], {'available': 0, 'total': 0})
+        region_stats['total'] += 1
+        if row['availability_status'] == 'AVAILABLE':
+            region_stats['available'] += 1
+
+    write_cache('region_stats', key, stats)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Scan regions in priority order and stop early
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_first_match_scan(regions, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, drcc, first_count, max_workers=10, deadline=None):
+
+    """
+    Scans regions concurrently in priority order and cancels outstanding work 
+    once first_count AVAILABLE cells are found, or the sweep deadline expires. Returns the rows gathered.
+    """
+
+    deadline = deadline or new_sweep_deadline()
+    start_time = time.time()
+    stop_event = threading.Event()
+    found_lock = threading.Lock()
+    found = {'available': 0}
+    rows = ResultTable()
+
+    def count_available(rows):
+        with found_lock:
+            found['available'] += sum(1 for row in rows if row['availability_status'] == 'AVAILABLE')
+            if found['available'] >= first_count:
+                stop_event.set()
+
+    def collect_rows(future):
+        rows.extend(future.result())
+        renderer.group_done(futures[future])
+        return stop_event.is_set()
+
+    # Rows are rendered in priority order
+    renderer = LiveTable(
+        lambda row: format_report_row(row, drcc),
+        [(None, region.region_name) for region in regions]
+    )
+
+    # Regions are submitted in priority order, the pool size bounds how many run at once
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                process_region,
+                region,
+                config,
+                signer,
+                compartment_id,
+                user_shape_name,
+                user_shape_ocpus,
+                user_shape_memory,
+                renderer,
+                None,
+                stop_event,
+                count_available,
+                deadline
+            ): (None, region.region_name)
+            for region in regions
+        }
+
+        # Regions not started are dropped, running ones stop after their current availability domain
+        abandoned = wait_for_regions(futures, deadline, collect_rows)
+        if deadline.expired():
+            rows += report_abandoned_regions([futures[future] for future in abandoned], deadline, renderer, user_shape_name, user_shape_ocpus, user_shape_memory)
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        renderer.close()
+
+    update_region_stats(config['tenancy'], user_shape_name, rows)
+
+    print()
+    if stop_event.is_set():
+        print_info(green, 'First match', 'found', f"{found['available']} available in {time.time() - start_time:.1f}s")
+    else:
+        print_info(yellow, 'First match', 'not found', f"{found['available']} of {first_count} available")
+
+    return rows
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Compare capacity across compartments
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_compartment_comparison(regions, config, signer, compartments, user_shape_name, user_shape_ocpus, user_shape_memory, max_workers=10, deadline=None):
+
+    """
+    Runs the capacity sweep of every (region, compartment) pair concurrently, sharing clients,
+    topology and shape caches, then prints one line per cell with the status seen by each compartment.
+    Cells where compartments disagree are highlighted. Returns the rows of every compartment.
+    Pairs still pending when the sweep deadline expires, or on Ctrl-C, are reported TIMED_OUT or CANCELLED.
+    """
+
+    deadline = deadline or new_sweep_deadline()
+    shape_ocpus, shape_memory = resolve_shape_request(user_shape_name, user_shape_ocpus, user_shape_memory)
+
+    compartment_names = dict(compartments)
+    region_errors = {}
+
+    # Status of each cell seen by each compartment, folded in as each pair completes
+    cells = {}
+    rows = ResultTable()
+
+    def collect_rows(future):
+        region_name, compartment_id = futures[future]
+        try:
+            for row in future.result():
+                cell = (row['region'], row['availability_domain'], row['fault_domain'] or '-')
+                cells.setdefault(cell, {})[compartment_id] = row['availability_status']
+                rows.append(dict(row, compartment=compartment_names[compartment_id]))
+        except oci.exceptions.ServiceError as e:
+            region_errors[(region_name, compartment_id)] = e.code or 'ERROR'
+        except SystemExit:
+            region_errors[(region_name, compartment_id)] = 'ERROR'
+
+    # Every (region, compartment) pair runs under the sweep deadline, each with its own region deadline
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                query_region_capacity,
+                region.region_name,
+                config,
+                signer,
+                compartment_id,
+                user_shape_name,
+                shape_ocpus,
+                shape_memory,
+                deadline
+            ): (region.region_name, compartment_id)
+            for region in sort_regions_by_latency(config['tenancy'], regions)
+            for compartment_id, _ in compartments
+        }
+
+        for future in wait_for_regions(futures, deadline, collect_rows):
+            region_name, compartment_id = futures[future]
+            region_errors[(region_name, compartment_id)] = deadline.status
+            rows.append(dict(
+                abandoned_cell_row(region_name, '-', None, user_shape_name, shape_ocpus, shape_memory, None, deadline.status),
+                compartment=compartment_names[compartment_id]
+            ))
+
+    finally:
+        # Stuck requests end with their own timeout, bounded by the deadlines
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for region_name, compartment_id in region_errors:
+        if not any(cell[0] == region_name for cell in cells):
+            cells[(region_name, '-', '-')] = {}
+
+    header = f"\n{'REGION':<20} {'AVAILABILITY_DOMAIN':<30} {'FAULT_DOMAIN':<20}"
+    for _, compartment_name in compartments:
+        header += f" {compartment_name[:23]:<24}"
+    print(header + "\n")
+
+    differences = 0
+    for cell in sorted(cells):
+        statuses = [
+            cells[cell].get(compartment_id) or region_errors.get((cell[0], compartment_id), '-')
+            for compartment_id, _ in compartments
+        ]
+
+        line = f"{cell[0]:<20} {cell[1]:<30} {cell[2]:<20}" + ''.join(f" {status:<24}" for status in statuses)
+        if len(set(statuses)) > 1:
+            differences += 1
+            print(yellow(line + ' *'))
+        elif statuses[0] == 'AVAILABLE':
+            print(green(line))
+        else:
+            print(line)
+
+    # Summary per compartment
+    print()
+    for compartment_id, compartment_name in compartments:
+        compartment_statuses = [statuses.get(compartment_id) for statuses in cells.values()]
+        available = sum(1 for status in compartment_statuses if status == 'AVAILABLE')
+        color = green if available else red
+        print_info(color, 'Compartment', f"{available}/{len(cells)} available", compartment_name)
+
+    print_info(yellow if differences else green, 'Compartments', 'differences', f"{differences} cells")
+
+    return rows
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Watch capacity and notify transitions
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def run_watch(regions, config, signer, compartment_id, user_shape_name, user_shape_ocpus, user_shape_memory, drcc, interval, notifier=None, max_workers=10):
+
+    """
+    Repeats the region sweep every interval seconds, retains each run in the history
+    and hands it to the notifier, until Ctrl-C. Each run has its own sweep deadline.
+    Each run sweeps the regions offering the shape, from the shape index refreshed after -shapes-ttl.
+    """
+
+    shape_ocpus, shape_memory = resolve_shape_request(user_shape_name, user_shape_ocpus, user_shape_memory)
+    shape_regions = None
+
+    while True:
+        start_time = time.time()
+        deadline = new_sweep_deadline()
+
+        shape_index = get_shape_index(config, signer, regions, max_workers)
+        offering_regions = [region for region in regions if shape_index.offers(user_shape_name, region.region_name)]
+        if shape_regions is not None and offering_regions != shape_regions:
+            print_info(yellow, 'Watch', 'regions', f"{len(offering_regions)} offering {user_shape_name}")
+        shape_regions = offering_regions
+
+        print_report_header(drcc)
+        rows = run_region_sweep(shape_regions, config, signer, compartment_id, user_shape_name, shape_ocpus, shape_memory, drcc, max_workers, deadline)
+
+        print()
+        record_history(rows)
+        if notifier:
+            events = notifier.process(rows)
+            print_info(yellow if events else green, 'Watch', 'transitions', f"{len(events)} at {time.strftime('%H:%M:%S')}")
+
+        if deadline.cancelled:
+            return
+
+        try:
+            time.sleep(max(0, interval - (time.time() - start_time)))
+        except KeyboardInterrupt:
+            return
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+import time
+import threading
+from modules.identity import get_availability_domains, get_fault_domains
+from modules.stream import page_records
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# In-memory topology and shapes caches
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+topology_cache = {}
+topology_lock = threading.Lock()
+
+def get_or_load(key, loader, *args):
+
+    """
+    Returns the cached value for key, calling loader(*args) on the first request only.
+    """
+
+    with topology_lock:
+        if key in topology_cache:
+            return topology_cache[key]
+
+    value = loader(*args)
+
+    with topology_lock:
+        return topology_cache.setdefault(key, value)
+
+def get_or_reload(key, ttl, loader, *args):
+
+    """
+    Returns the cached value for key while younger than ttl seconds, then calls loader(*args) again.
+    """
+
+    with topology_lock:
+        entry = topology_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+
+    value = loader(*args)
+
+    with topology_lock:
+        topology_cache[key] = (time.monotonic(), value)
+    return value
+
+def get_cached_availability_domains(identity_client, tenancy_id, region_name):
+
+    """
+    Returns the availability domains of a region, fetched once per process.
+    """
+
+    return get_or_load(('ads', tenancy_id, region_name), get_availability_domains, identity_client, tenancy_id)
+
+def get_cached_fault_domains(identity_client, tenancy_id, region_name, availability_domain):
+
+    """
+    Returns the fault domains of an availability domain, fetched once per process.
+    """
+
+    return get_or_load(('fds', tenancy_id, region_name, availability_domain), get_fault_domains, identity_client, tenancy_id, availability_domain)
+
+def get_cached_shapes(core_client, compartment_id, region_name):
+
+    """
+    Returns the compute shapes available to a compartment in a region, fetched once per process.
+    """
+
+    return get_or_load(('shapes', compartment_id, region_name), load_shapes, core_client, compartment_id)
+
+def load_shapes(core_client, compartment_id):
+
+    """
+    Streams every page of shapes and keeps one model per shape name.
+    """
+
+    shapes = {}
+    for shape in page_records(core_client.list_shapes, compartment_id):
+        shapes.setdefault(shape.shape, shape)
+
+    return list(shapes.values())
+
+def forget_cached_shapes(compartment_id, region_name):
+
+    """
+    Drops the shapes of a region from memory, they are listed again on the next request.
+    """
+
+    with topology_lock:
+        topology_cache.pop(('shapes', compartment_id, region_name), None)
+
+def clear_topology_cache():
+    with topology_lock:
+        topology_cache.clear()
@@ -0,0 +1,102 @@
+# coding: utf-8
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from modules.utils import print_error, path_expander
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Trace spans
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+trace_settings = {'tracer': None}
+
+class Tracer:
+
+    """
+    Collects spans as Chrome trace events ("X" complete events, one track per thread),
+    readable by chrome://tracing, https://ui.perfetto.dev and flamegraph tools such as speedscope.
+    """
+
+    def __init__(self, path):
+        self.path = path_expander(path)
+        self.start_ns = time.perf_counter_ns()
+        self.lock = threading.Lock()
+        self.events = []
+        self.threads = {}
+
+    @contextmanager
+    def span(self, name, **args):
+        thread = threading.current_thread()
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            event = {
+                'name': name,
+                'ph': 'X',
+                'ts': (start_ns - self.start_ns) / 1000,
+                'dur': (time.perf_counter_ns() - start_ns) / 1000,
+                'pid': os.getpid(),
+                'tid': thread.ident
+            }
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            with self.lock:
+                self.events.append(event)
+                self.threads[thread.ident] = thread.name
+
+    def save(self):
+        with self.lock:
+            thread_names = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                for tid, name in self.threads.items()
+            ]
+            events = thread_names + self.events
+
+        try:
+            with open(self.path, 'w') as trace_file:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        except OSError as e:
+            print_error("Trace error:", self.path, e, level='INFO')
+
+def start_trace(path):
+
+    """
+    Starts collecting spans, the trace file is written when the script exits.
+    """
+
+    tracer = Tracer(path)
+    trace_settings['tracer'] = tracer
+    atexit.register(tracer.save)
+
+    return tracer
+
+def trace_span(name, **args):
+
+    """
+    Returns a context manager recording a span, or doing nothing when tracing is disabled.
+    """
+
+    tracer = trace_settings['tracer']
+    return tracer.span(name, **args) if tracer else nullcontext()
+
+def traced(function):
+
+    """
+    Decorator recording every call of a function as a span named after it.
+    Without -trace, the function is called directly.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tracer = trace_settings['tracer']
+        if tracer is None:
+            return function(*args, **kwargs)
+        with tracer.span(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
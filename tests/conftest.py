@@ -0,0 +1,18 @@
+# coding: utf-8
+
+import os
+import sys
+import pytest
+
+# The script imports its modules from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+
+    """
+    Every test gets its own empty local cache, removed with tmp_path.
+    """
+
+    monkeypatch.setenv('OCI_CCR_CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
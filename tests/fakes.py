@@ -0,0 +1,248 @@
+# coding: utf-8
+
+import io
+import json
+import threading
+import contextlib
+from collections import Counter
+from types import SimpleNamespace
+from urllib.parse import urlparse
+import oci
+from oci._vendor import requests
+from modules.clients import set_client_factory, clear_client_pool
+from modules.topology import clear_topology_cache
+from modules.deadline import set_timeouts
+from modules.limits import set_limits_check
+from modules.capacity import capacity_batcher, set_capacity_cache, set_batch_window, set_query_mode, set_report_budget
+from modules.sweep import run_region_sweep
+from modules.shapes import set_shape_index_ttl
+from modules.cassette import ReplaySigner
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Fake OCI clients
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+class FakeTenancy:
+
+    """
+    Topology and capacity served by the fake clients, and the API calls they received.
+    availability maps a region name to the status of every cell, OUT_OF_HOST_CAPACITY by default.
+    missing_shapes maps a region name to the shape names it does not offer.
+    Capacity reports are held until release is set (set at once unless blocked), and with
+    overlap_regions until that many regions have a capacity report in flight.
+    """
+
+    def __init__(self, regions, availability_domains=2, fault_domains=3, availability=None, missing_shapes=None, blocked=False, overlap_regions=0):
+        self.regions = regions
+        self.availability_domains = {region: [f"FAKE:{region}-AD-{index}" for index in range(1, availability_domains + 1)] for region in regions}
+        self.fault_domains = [f"FAULT-DOMAIN-{index}" for index in range(1, fault_domains + 1)]
+        self.availability = availability or {}
+        self.missing_shapes = missing_shapes or {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+        self.overlap_regions = overlap_regions
+        self.overlap = threading.Event()
+        self.reports_in_flight = Counter()
+        self.shapes = [
+            fake_shape('VM.Standard.E5.Flex', 1, 12, ocpu_max=94, memory_max=1049, memory_per_ocpu_max=64),
+            fake_shape('VM.Standard.A2.Flex', 1, 2, ocpu_max=78, memory_max=946, memory_per_ocpu_max=64),
+            fake_shape('VM.DenseIO.E5.Flex', 8, 96, ocpu_max=48, memory_max=576, memory_per_ocpu_max=12),
+            fake_shape('BM.Standard.E5.192', 192, 2304),
+            fake_shape('VM.Standard2.1', 1, 15)
+        ]
+
+    def count(self, operation):
+        with self.lock:
+            self.calls[operation] += 1
+
+    def report_started(self, region):
+        with self.lock:
+            self.reports_in_flight[region] += 1
+            if self.overlap_regions and sum(1 for count in self.reports_in_flight.values() if count) >= self.overlap_regions:
+                self.overlap.set()
+
+    def report_done(self, region):
+        with self.lock:
+            self.reports_in_flight[region] -= 1
+
+    def client(self, client_class, config, signer):
+
+        """
+        Client factory handed to set_client_factory.
+        """
+
+        if client_class is oci.identity.IdentityClient:
+            return FakeIdentityClient(self, config)
+        if client_class is oci.core.ComputeClient:
+            return FakeComputeClient(self, config)
+        raise ValueError(f"No fake client for {client_class.__name__}")
+
+def fake_shape(name, ocpus, memory, ocpu_max=None, memory_max=None, memory_per_ocpu_max=None):
+    shape = oci.core.models.Shape(shape=name, ocpus=ocpus, memory_in_gbs=memory)
+    if ocpu_max:
+        shape.ocpu_options = oci.core.models.ShapeOcpuOptions(min=1, max=ocpu_max)
+        shape.memory_options = oci.core.models.ShapeMemoryOptions(min_in_g_bs=1, max_in_g_bs=memory_max, max_per_ocpu_in_gbs=memory_per_ocpu_max)
+    return shape
+
+def fake_response(data):
+    return oci.response.Response(200, {}, data, None)
+
+class FakeClient:
+
+    def __init__(self, tenancy, config):
+        self.tenancy = tenancy
+        self.region = config['region']
+        self.base_client = SimpleNamespace(timeout=None, session=None)
+
+class FakeIdentityClient(FakeClient):
+
+    def list_availability_domains(self, compartment_id, **kwargs):
+        self.tenancy.count('list_availability_domains')
+        return fake_response([
+            oci.identity.models.AvailabilityDomain(name=name, compartment_id=compartment_id)
+            for name in self.tenancy.availability_domains[self.region]
+        ])
+
+    def list_fault_domains(self, compartment_id, availability_domain, **kwargs):
+        self.tenancy.count('list_fault_domains')
+        return fake_response([
+            oci.identity.models.FaultDomain(name=name, availability_domain=availability_domain, compartment_id=compartment_id)
+            for name in self.tenancy.fault_domains
+        ])
+
+class FakeComputeClient(FakeClient):
+
+    def list_shapes(self, compartment_id, **kwargs):
+        self.tenancy.count('list_shapes')
+        missing_shapes = self.tenancy.missing_shapes.get(self.region, ())
+        return fake_response([shape for shape in self.tenancy.shapes if shape.shape not in missing_shapes])
+
+    def create_compute_capacity_report(self, create_compute_capacity_report_details=None, **kwargs):
+        self.tenancy.count('create_compute_capacity_report')
+        if 'retry_strategy' in kwargs:
+            self.tenancy.count('deadline_retry_strategy')
+
+        self.tenancy.report_started(self.region)
+        try:
+            # A sequential sweep never reaches the overlap, the wait only bounds the failure
+            if self.tenancy.overlap_regions:
+                self.tenancy.overlap.wait(5)
+            self.tenancy.release.wait()
+        finally:
+            self.tenancy.report_done(self.region)
+
+        status = self.tenancy.availability.get(self.region, 'OUT_OF_HOST_CAPACITY')
+        return fake_response(oci.core.models.ComputeCapacityReport(
+            availability_domain=create_compute_capacity_report_details.availability_domain,
+            shape_availabilities=[
+                oci.core.models.CapacityReportShapeAvailability(
+                    instance_shape=requested.instance_shape,
+                    fault_domain=requested.fault_domain,
+                    instance_shape_config=requested.instance_shape_config,
+                    available_count=None,
+                    availability_status=status
+                )
+                for requested in create_compute_capacity_report_details.shape_availabilities
+            ]
+        ))
+
+class FakeHttpSession:
+
+    """
+    HTTP session of real SDK clients answering from the fake clients, so requests go through
+    the SDK serialization and the cassette. Counts the requests actually sent.
+    """
+
+    def __init__(self, tenancy):
+        self.tenancy = tenancy
+        self.base_client = oci.core.ComputeClient({'region': tenancy.regions[0]}, signer=ReplaySigner()).base_client
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        self.tenancy.count('http_requests')
+        parsed_url = urlparse(url)
+        config = {'region': parsed_url.hostname.split('.')[1]}
+        params = params or {}
+
+        if parsed_url.path.endswith('/availabilityDomains'):
+            response = FakeIdentityClient(self.tenancy, config).list_availability_domains(params['compartmentId'])
+        elif parsed_url.path.endswith('/faultDomains'):
+            response = FakeIdentityClient(self.tenancy, config).list_fault_domains(params['compartmentId'], params['availabilityDomain'])
+        elif parsed_url.path.endswith('/shapes'):
+            response = FakeComputeClient(self.tenancy, config).list_shapes(params['compartmentId'])
+        elif parsed_url.path.endswith('/computeCapacityReports'):
+            details = self.base_client.deserialize_response_data(data.encode('utf-8') if isinstance(data, str) else data, 'CreateComputeCapacityReportDetails')
+            response = FakeComputeClient(self.tenancy, config).create_compute_capacity_report(details)
+        else:
+            raise ValueError(f"No fake response for {method} {url}")
+
+        http_response = requests.Response()
+        http_response.status_code = 200
+        http_response.headers = requests.structures.CaseInsensitiveDict({'content-type': 'application/json'})
+        http_response._content = json.dumps(self.base_client.sanitize_for_serialization(response.data)).encode('utf-8')
+        http_response.encoding = 'utf-8'
+        http_response.url = url
+        return http_response
+
+    def close(self):
+        pass
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Isolated sweeps
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+FAKE_TENANCY_ID = 'ocid1.tenancy.oc1..fake'
+
+@contextlib.contextmanager
+def isolated_run(tenancy, settings, factory=None):
+
+    """
+    Runs with the fake clients, empty in-memory caches and the given settings, then restores the defaults.
+    The cache directory comes from the cache_dir fixture. Batches close as soon as every fault domain
+    of an availability domain joined, the batch window only bounds the wait of lone cells.
+    """
+
+    set_client_factory(factory or tenancy.client)
+    clear_client_pool()
+    clear_topology_cache()
+    set_capacity_cache(settings.get('max_age', 0))
+    set_batch_window(settings.get('batch_window', 500))
+    capacity_batcher.max_batch_size = len(tenancy.fault_domains)
+    set_query_mode(settings.get('ad_level', False), settings.get('fd_detail', False))
+    set_report_budget(10)
+    set_timeouts()
+    set_limits_check(False)
+    set_shape_index_ttl(86400)
+
+    try:
+        yield
+    finally:
+        set_client_factory(None)
+        clear_client_pool()
+        clear_topology_cache()
+        set_capacity_cache(0)
+        set_batch_window(20)
+        capacity_batcher.max_batch_size = 20
+        set_query_mode(False)
+        set_timeouts()
+
+def fake_config(tenancy):
+    return {'tenancy': FAKE_TENANCY_ID, 'region': tenancy.regions[0]}
+
+def fake_regions(tenancy):
+    return [SimpleNamespace(region_name=region) for region in tenancy.regions]
+
+def run_fake_sweep(tenancy, shape_name='VM.Standard.E5.Flex', ocpus=2, memory=16, regions=None, signer=None):
+
+    """
+    Runs a region sweep against the fake clients, with the report output captured. Returns (rows, output).
+    """
+
+    config = fake_config(tenancy)
+    regions = regions or fake_regions(tenancy)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        rows = run_region_sweep(regions, config, signer, config['tenancy'], shape_name, ocpus, memory, False)
+
+    return list(rows), output.getvalue()
@@ -0,0 +1,52 @@
+# coding: utf-8
+
+from modules.cassette import cassette_settings, Cassette, ReplaySigner, attach_cassette, record_session, replay_session
+from fakes import FakeTenancy, FakeHttpSession, isolated_run, fake_config, run_fake_sweep
+
+def test_cassette_round_trip(tmp_path):
+
+    """
+    A sweep recorded through the SDK replays to the same rows, without sending any request.
+    Cassette runs query every cell in its own request (no batching), as the script does.
+    """
+
+    tenancy = FakeTenancy(['eu-frankfurt-1', 'eu-paris-1'], availability={'eu-paris-1': 'AVAILABLE'})
+    http_session = FakeHttpSession(tenancy)
+    path = str(tmp_path / 'sweep.cassette')
+
+    def cassette_client(client_class, config, signer):
+        client = client_class(config=config, signer=signer)
+        client.base_client.session = http_session
+        return attach_cassette(client)
+
+    def sweep(mode):
+        cassette_settings['cassette'] = Cassette(path, mode)
+        try:
+            with isolated_run(tenancy, {'batch_window': 0}, cassette_client):
+                rows, _ = run_fake_sweep(tenancy, signer=ReplaySigner())
+            if mode == 'record':
+                record_session(fake_config(tenancy), 'api_key', 'DEFAULT')
+                cassette_settings['cassette'].save()
+            else:
+                assert replay_session()[0] == fake_config(tenancy)
+        finally:
+            cassette_settings['cassette'] = None
+        return sorted((row['region'], row['availability_domain'], row['fault_domain'] or '', row['availability_status']) for row in rows)
+
+    recorded_rows = sweep('record')
+    recorded_requests = tenancy.calls['http_requests']
+
+    assert recorded_rows
+    assert sweep('replay') == recorded_rows
+    assert tenancy.calls['http_requests'] == recorded_requests
+
+def test_cassette_without_session(tmp_path):
+
+    """
+    A run ended before authentication leaves no cassette behind, it could not be replayed.
+    """
+
+    path = tmp_path / 'empty.cassette'
+    Cassette(str(path), 'record').save()
+
+    assert not path.exists()
@@ -0,0 +1,67 @@
+# coding: utf-8
+
+import threading
+import oci
+from modules.coalesce import SingleFlight, CapacityBatcher
+
+def capacity_cell(fault_domain, ocpus):
+    return oci.core.models.CreateComputeCapacityReportDetails(
+        compartment_id='ocid1.tenancy.oc1..fake',
+        availability_domain='FAKE:AD-1',
+        shape_availabilities=[oci.core.models.CreateCapacityReportShapeAvailabilityDetails(
+            instance_shape='VM.Standard.E5.Flex',
+            fault_domain=fault_domain,
+            instance_shape_config=oci.core.models.CapacityReportInstanceShapeConfig(ocpus=ocpus)
+        )]
+    )
+
+def test_batched_cells_without_shape_config_in_results():
+
+    """
+    Results that do not echo the shape config are matched on shape and fault domain:
+    cells differing only by their config must never share a request.
+    """
+
+    batches = []
+
+    def send(core_client, report_details):
+        batches.append(len(report_details.shape_availabilities))
+        return [
+            oci.core.models.CapacityReportShapeAvailability(
+                instance_shape=requested.instance_shape,
+                fault_domain=requested.fault_domain,
+                available_count=int(requested.instance_shape_config.ocpus),
+                availability_status='AVAILABLE'
+            )
+            for requested in report_details.shape_availabilities
+        ]
+
+    batcher = CapacityBatcher(send, window=0.5, max_batch_size=4)
+    results = {}
+
+    def fetch(fault_domain, ocpus):
+        results[(fault_domain, ocpus)] = batcher.fetch('client', capacity_cell(fault_domain, ocpus))
+
+    threads = [threading.Thread(target=fetch, args=(fault_domain, ocpus)) for fault_domain in ('FD-1', 'FD-2') for ocpus in (1.0, 2.0)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(batches) == [2, 2]
+    assert {cell: [result.available_count for result in rows] for cell, rows in results.items()} == {
+        ('FD-1', 1.0): [1], ('FD-1', 2.0): [2], ('FD-2', 1.0): [1], ('FD-2', 2.0): [2]
+    }
+
+def test_single_flight_shares_errors():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ValueError('shared')
+
+    try:
+        single_flight.do('key', fail)
+    except ValueError as e:
+        assert str(e) == 'shared'
+    else:
+        raise AssertionError('the error was not raised')
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+import json
+import oci
+from oci._vendor import requests
+from modules.credentials import ManagedSigner
+
+class FakeTokenSigner:
+
+    """
+    Security token signer of an authentication method, refused by the service until refreshed once.
+    """
+
+    region = 'eu-frankfurt-1'
+
+    def __init__(self):
+        self.refreshes = 0
+        self.signed = 0
+
+    def __call__(self, request, enforce_content_headers=True):
+        self.signed += 1
+        request.headers['authorization'] = f"token-{self.refreshes}"
+        return request
+
+    def refresh_security_token(self):
+        self.refreshes += 1
+
+class TokenCheckingSession:
+
+    """
+    HTTP session rejecting with a 401 the requests signed with a token never refreshed.
+    """
+
+    def __init__(self):
+        self.statuses = []
+
+    def request(self, method, url, auth=None, headers=None, **kwargs):
+        signed = auth(requests.Request(method, url, headers=dict(headers or {})).prepare())
+        status = 401 if signed.headers['authorization'] == 'token-0' else 200
+        self.statuses.append(status)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = requests.structures.CaseInsensitiveDict({'content-type': 'application/json', 'opc-request-id': 'fake'})
+        response._content = json.dumps([] if status == 200 else {'code': 'NotAuthenticated', 'message': 'expired'}).encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    def close(self):
+        pass
+
+def test_sdk_refresh_path():
+
+    """
+    A request rejected with a 401 refreshes the wrapped signer through the proxy and is retried once,
+    without any state written onto the proxy by the SDK or the base signer class.
+    """
+
+    token_signer = FakeTokenSigner()
+    signer = ManagedSigner(token_signer)
+    proxy_state = dict(vars(signer))
+
+    client = oci.core.ComputeClient({'region': token_signer.region}, signer=signer, retry_strategy=oci.retry.NoneRetryStrategy())
+    client.base_client.session = TokenCheckingSession()
+
+    assert client.base_client.is_instance_principal_or_resource_principal_signer()
+    assert client.list_shapes('ocid1.compartment.oc1..fake').data == []
+    assert client.base_client.session.statuses == [401, 200]
+    assert token_signer.refreshes == 1
+    assert token_signer.signed == 2
+    assert vars(signer) == proxy_state
+
+def test_signer_methods_delegated():
+
+    """
+    The base signer class is never initialized, so every method it defines must be overridden.
+    """
+
+    inherited = {
+        name
+        for base in ManagedSigner.__mro__[1:-1]
+        for name, value in vars(base).items()
+        if (name == '__call__' or not name.startswith('_')) and (callable(value) or isinstance(value, property))
+    }
+
+    assert inherited
+    assert {name for name in inherited if name not in vars(ManagedSigner)} == set()
@@ -0,0 +1,62 @@
+# coding: utf-8
+
+import oci
+import pytest
+from types import SimpleNamespace
+from modules.clients import set_client_factory, clear_client_pool
+from modules.limits import set_limits_check, shape_limit_family, limit_family, limited_availability_domains
+
+AVAILABILITY_DOMAINS = ['FAKE:EU-FRANKFURT-1-AD-1', 'FAKE:EU-FRANKFURT-1-AD-2']
+
+class FakeLimitsClient:
+
+    """
+    Limits client serving limit values, every resource of them still available.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def list_limit_values(self, compartment_id, service_name, **kwargs):
+        return oci.response.Response(200, {}, [
+            oci.limits.models.LimitValueSummary(name=name, scope_type=scope_type, availability_domain=availability_domain, value=value)
+            for name, scope_type, availability_domain, value in self.values
+        ], None)
+
+    def get_resource_availability(self, service_name, limit_name, compartment_id, **kwargs):
+        return oci.response.Response(200, {}, SimpleNamespace(available=1), None)
+
+@pytest.mark.parametrize('shape_name, limit_name, matches', [
+    ('VM.Standard.E5.Flex', 'standard-e5-core-count', True),
+    ('VM.Standard.E5.Flex', 'standard-e5-memory-count', True),
+    ('VM.DenseIO.E4.Flex', 'dense-io-e4-core-count', True),
+    ('BM.GPU.H100.8', 'gpu-h100-count', True),
+    ('VM.Standard.E2.1', 'standard-e2-micro-core-count', False),
+    ('VM.Standard.A1.Flex', 'standard-a10-core-count', False),
+    ('VM.Standard.E5.Flex', 'standard-e5-reserved-count', False),
+])
+def test_limit_family(shape_name, limit_name, matches):
+    assert (limit_family(limit_name) == shape_limit_family(shape_name)) is matches
+
+def test_limited_availability_domains():
+
+    """
+    Only a zero limit of the exact shape family prunes an availability domain.
+    """
+
+    client = FakeLimitsClient([
+        ['standard-e2-micro-core-count', 'AD', AVAILABILITY_DOMAINS[0], 0],
+        ['standard-e2-core-count', 'AD', AVAILABILITY_DOMAINS[1], 0],
+    ])
+    set_client_factory(lambda client_class, config, signer: client)
+    clear_client_pool()
+    set_limits_check(True)
+
+    try:
+        limited = limited_availability_domains({'tenancy': 'ocid1.tenancy.oc1..fake'}, None, 'ocid1.tenancy.oc1..fake', 'eu-frankfurt-1', 'VM.Standard.E2.1', AVAILABILITY_DOMAINS)
+    finally:
+        set_client_factory(None)
+        clear_client_pool()
+        set_limits_check(False)
+
+    assert limited == {AVAILABILITY_DOMAINS[1]}
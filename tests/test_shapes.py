@@ -0,0 +1,88 @@
+# coding: utf-8
+
+import io
+import contextlib
+import pytest
+from modules.capacity import get_shape_config, build_report_details
+from modules.topology import clear_topology_cache
+from modules.shapes import set_shape_index_ttl, get_shape_index, select_shape_regions
+from fakes import FakeTenancy, isolated_run, fake_config, fake_regions, run_fake_sweep
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Golden shape configurations
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# (shape, requested oCPUs, requested memory) -> (oCPUs, memory, is flex, matched shape name)
+GOLDEN_SHAPE_CONFIGS = [
+    (('VM.Standard.E5.Flex', 2, 16), (2, 16, True, 'VM.Standard.E5.Flex')),
+    (('VM.Standard.E5.Flex', 4, 1), (4, 4, True, 'VM.Standard.E5.Flex')),
+    (('VM.Standard.E5.Flex', 200, 4000), (94, 1049, True, 'VM.Standard.E5.Flex')),
+    (('VM.Standard.A2.Flex', 4, 4), (4, 8, True, 'VM.Standard.A2.Flex')),
+    (('VM.Standard.A2.Flex', 100, 4000), (78, 946, True, 'VM.Standard.A2.Flex')),
+    (('VM.DenseIO.E5.Flex', 16, None), (16, '', True, None)),
+    (('BM.Standard.E5.192', 0, 0), (0, 0, False, 'BM.Standard.E5.192')),
+    (('VM.Standard2.1', 0, 0), (0, 0, False, 'VM.Standard2.1')),
+    (('VM.Standard.E4.Flex', 8, 64), (1, 1, True, None))
+]
+
+# (shape, oCPUs, memory, is flex) -> (displayed oCPUs, displayed memory, (requested oCPUs, memory, NVMe) or None)
+GOLDEN_REPORT_DETAILS = [
+    (('VM.Standard.E5.Flex', 2, 16, True), (2, 16, (2.0, 16.0, None))),
+    (('VM.DenseIO.E5.Flex', 16.0, '', True), (16.0, 192.0, (16.0, 192.0, 2.0))),
+    (('BM.Standard.E5.192', 0, 0, False), (192, 2304, None)),
+    (('VM.Standard2.1', 0, 0, False), (1, 15, None))
+]
+
+@pytest.mark.parametrize('request_config, expected', GOLDEN_SHAPE_CONFIGS)
+def test_shape_config(request_config, expected):
+    shape_name, ocpus, memory = request_config
+    shape_ocpus, shape_memory, shape_is_flex, shape_info = get_shape_config(shape_name, FakeTenancy(['eu-frankfurt-1']).shapes, ocpus, memory)
+
+    assert (shape_ocpus, shape_memory, shape_is_flex, getattr(shape_info, 'shape', None)) == expected
+
+@pytest.mark.parametrize('request_config, expected', GOLDEN_REPORT_DETAILS)
+def test_report_details(request_config, expected):
+    shape_name, ocpus, memory, shape_is_flex = request_config
+    shapes = {shape.shape: shape for shape in FakeTenancy(['eu-frankfurt-1']).shapes}
+
+    details, shape_ocpus, shape_memory = build_report_details('AD-1', None, 'ocid1.tenancy.oc1..fake', shapes.get(shape_name), shape_name, ocpus, memory, shape_is_flex)
+    shape_config = details.shape_availabilities[0].instance_shape_config
+    requested = (shape_config.ocpus, shape_config.memory_in_gbs, shape_config.nvmes) if shape_config else None
+
+    assert (shape_ocpus, shape_memory, requested) == expected
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Cross-region shape index
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+def test_shape_index():
+
+    """
+    The shape index lists every region once, and the sweep reuses those listings. A shape missing
+    from a region skips the region, an unknown shape is rejected without any call,
+    a new process reads the listings from the local cache, and expired listings are listed again.
+    """
+
+    tenancy = FakeTenancy(['eu-frankfurt-1', 'eu-paris-1'], missing_shapes={'eu-paris-1': ['VM.Standard.A2.Flex']})
+    config = fake_config(tenancy)
+    regions = fake_regions(tenancy)
+
+    with isolated_run(tenancy, {}), contextlib.redirect_stdout(io.StringIO()):
+        shape_index = get_shape_index(config, None, regions)
+
+        shape_regions = select_shape_regions(shape_index, regions, 'VM.Standard.A2.Flex')
+        assert [region.region_name for region in shape_regions] == ['eu-frankfurt-1']
+        assert not select_shape_regions(shape_index, regions, 'VM.Standard.E9.Flex')
+
+        rows, _ = run_fake_sweep(tenancy, 'VM.Standard.A2.Flex', regions=shape_regions)
+        assert {row['region'] for row in rows} == {'eu-frankfurt-1'}
+
+        # A new process: empty in-memory caches, listings read from the local cache
+        clear_topology_cache()
+        assert get_shape_index(config, None, regions).shape_names() == shape_index.shape_names()
+        assert tenancy.calls['list_shapes'] == 2
+
+        # A long running process sees a shape added to a region once the shapes TTL has passed
+        tenancy.missing_shapes = {}
+        set_shape_index_ttl(0)
+        assert get_shape_index(config, None, regions).offers('VM.Standard.A2.Flex', 'eu-paris-1')
+
+    assert tenancy.calls['list_shapes'] == 4
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+import io
+import contextlib
+import pytest
+from modules.deadline import set_timeouts
+from modules.capacity import cancel_pending_cells
+from modules.sweep import run_compartment_comparison
+from fakes import FakeTenancy, isolated_run, fake_config, fake_regions, run_fake_sweep
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Sweep call counts
+# - - - - - - - - - - - - - - - - - - - - - - - - - -
+# settings, sweeps, expected calls (missing operations must not be called), expected rows per sweep
+SWEEP_SCENARIOS = {
+    'fault domains, batched': ({}, 1,
+        {'list_availability_domains': 2, 'list_fault_domains': 4, 'list_shapes': 2, 'create_compute_capacity_report': 4}, 12),
+    'fault domains, unbatched': ({'batch_window': 0}, 1,
+        {'list_availability_domains': 2, 'list_fault_domains': 4, 'list_shapes': 2, 'create_compute_capacity_report': 12}, 12),
+    'availability domain level': ({'ad_level': True}, 1,
+        {'list_availability_domains': 2, 'list_shapes': 2, 'create_compute_capacity_report': 4}, 4),
+    'availability domain level, fault domain detail': ({'ad_level': True, 'fd_detail': True}, 1,
+        {'list_availability_domains': 2, 'list_fault_domains': 2, 'list_shapes': 2, 'create_compute_capacity_report': 6}, 8),
+    'second sweep from the capacity cache': ({'max_age': 300}, 2,
+        {'list_availability_domains': 2, 'list_fault_domains': 4, 'list_shapes': 2, 'create_compute_capacity_report': 4}, 12)
+}
+
+@pytest.mark.parametrize('settings, sweeps, expected_calls, expected_rows', SWEEP_SCENARIOS.values(), ids=SWEEP_SCENARIOS.keys())
+def test_sweep_calls(settings, sweeps, expected_calls, expected_rows):
+    tenancy = FakeTenancy(['eu-frankfurt-1', 'eu-paris-1'], availability={'eu-paris-1': 'AVAILABLE'})
+
+    with isolated_run(tenancy, settings):
+        for _ in range(sweeps):
+            rows, output = run_fake_sweep(tenancy)
+            assert len(rows) == expected_rows
+            assert all(row['region'] in output and row['availability_status'] in output for row in rows)
+
+    assert dict(tenancy.calls) == expected_calls
+
+def test_sweep_concurrency():
+
+    """
+    Regions are swept concurrently: capacity reports of both regions are in flight at the same time.
+    """
+
+    tenancy = FakeTenancy(['eu-frankfurt-1', 'eu-paris-1'], overlap_regions=2)
+
+    with isolated_run(tenancy, {}):
+        rows, _ = run_fake_sweep(tenancy)
+
+    assert tenancy.overlap.is_set()
+    assert {row['region'] for row in rows} == {'eu-frankfurt-1', 'eu-paris-1'}
+
+def test_region_deadline():
+
+    """
+    Cells still unanswered when the region deadline expires are reported TIMED_OUT,
+    and capacity reports get a retry strategy bounded by the time left.
+    """
+
+    tenancy = FakeTenancy(['eu-frankfurt-1'], blocked=True)
+
+    with isolated_run(tenancy, {}):
+        set_timeouts(region_timeout=1)
+        try:
+            rows, _ = run_fake_sweep(tenancy)
+        finally:
+            # Abandoned cells end before the fake clients are released
+            tenancy.release.set()
+            cancel_pending_cells()
+
+    assert rows and {row['availability_status'] for row in rows} == {'TIMED_OUT'}
+    assert tenancy.calls['deadline_retry_strategy'] == tenancy.calls['create_compute_capacity_report'] > 0
+
+def test_compartment_comparison_deadline():
+
+    """
+    Compartment comparisons are bounded by the region deadline like sweeps.
+    """
+
+    tenancy = FakeTenancy(['eu-frankfurt-1'], blocked=True)
+    compartments = [('ocid1.compartment.oc1..prod', 'Prod'), ('ocid1.compartment.oc1..dev', 'Dev')]
+
+    with isolated_run(tenancy, {}), contextlib.redirect_stdout(io.StringIO()):
+        set_timeouts(region_timeout=1)
+        try:
+            rows = run_compartment_comparison(fake_regions(tenancy), fake_config(tenancy), None, compartments, 'VM.Standard.E5.Flex', 2, 16)
+        finally:
+            tenancy.release.set()
+            cancel_pending_cells()
+
+    assert {row['compartment'] for row in rows} == {'Prod', 'Dev'}
+    assert {row['availability_status'] for row in rows} == {'TIMED_OUT'}